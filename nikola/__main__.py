@@ -31,6 +31,7 @@ import shutil
 import sys
 import traceback
 
+from doit import cmd_run
 from doit.loader import generate_tasks
 from doit.cmd_base import TaskLoader
 from doit.reporter import ExecutedOnlyReporter
@@ -41,9 +42,11 @@ from doit.cmd_clean import Clean as DoitClean
 from doit.cmd_auto import Auto as DoitAuto
 from logbook import NullHandler
 
-from . import __version__
+from . import __version__, DEBUG
 from .nikola import Nikola
-from .utils import _reload, sys_decode, get_root_dir, req_missing, LOGGER, STRICT_HANDLER
+from .dependency import BACKENDS, CHECKS, doit_backend
+from .runner import ForkRunner
+from .utils import _reload, sys_decode, get_root_dir, req_missing, LOGGER, STRICT_HANDLER, CacheStats, config_changed
 
 
 config = {}
@@ -110,6 +113,10 @@ def main(args):
     site = Nikola(**config)
     _ = DoitNikola(site, quiet).run(args)
 
+    if DEBUG:
+        for stats in CacheStats.registry:
+            LOGGER.debug(str(stats))
+
     if site.invariant:
         freeze.stop()
     return _
@@ -163,9 +170,43 @@ class Build(DoitRun):
                 'help': "Run quietly.",
             }
         )
+        opts.append(
+            {
+                'name': 'cache_stats',
+                'long': 'cache-stats',
+                'default': False,
+                'type': bool,
+                'help': "Show the hit and miss counts of Nikola's caches.",
+            }
+        )
         self.cmd_options = tuple(opts)
         super(Build, self).__init__(*args, **kw)
 
+    def execute(self, params, args):
+        """Run the tasks, and show the cache counters for --cache-stats."""
+        result = self._run(params, args)
+        # With NIKOLA_DEBUG they are logged after every command
+        if params.get('cache_stats') and not DEBUG:
+            for stats in CacheStats.registry:
+                LOGGER.info(str(stats))
+        return result
+
+    def _run(self, params, args):
+        """Run the tasks, in forked processes for -n N (see nikola.runner)."""
+        if not params.get('num_process') or params.get('par_type', 'process') != 'process':
+            return super(Build, self).execute(params, args)
+        if not ForkRunner.available():
+            LOGGER.warning('Cannot fork processes here, building serially.')
+            params['num_process'] = 0
+            return super(Build, self).execute(params, args)
+        # doit picks MRunner from cmd_run when it runs the tasks
+        mrunner = cmd_run.MRunner
+        cmd_run.MRunner = ForkRunner
+        try:
+            return super(Build, self).execute(params, args)
+        finally:
+            cmd_run.MRunner = mrunner
+
 
 class Clean(DoitClean):
     """A clean that removes cache/"""
@@ -199,12 +240,28 @@ class NikolaTaskLoader(TaskLoader):
                 'reporter': ExecutedOnlyReporter,
             }
         DOIT_CONFIG['default_tasks'] = ['render_site', 'post_render']
+        backend = self.nikola.config['DEPENDENCY_BACKEND']
+        if backend not in BACKENDS:
+            LOGGER.warn('Unknown DEPENDENCY_BACKEND {0!r}, using dbm.'.format(backend))
+            backend = 'dbm'
+        file_dep_check = self.nikola.config['FILE_DEP_CHECK']
+        if file_dep_check not in CHECKS:
+            LOGGER.warn('Unknown FILE_DEP_CHECK {0!r}, using md5.'.format(file_dep_check))
+            file_dep_check = 'md5'
+        DOIT_CONFIG['backend'], DOIT_CONFIG['dep_file'] = doit_backend(backend, file_dep_check)
+        config_changed.serializer.reset()
         tasks = generate_tasks(
             'render_site',
             self.nikola.gen_tasks('render_site', "Task", 'Group of tasks to render the site.'))
         latetasks = generate_tasks(
             'post_render',
             self.nikola.gen_tasks('post_render', "LateTask", 'Group of tasks to be executes after site is rendered.'))
+        if opt_values.get('num_process'):
+            # Serial builds run the default tasks in order, parallel ones
+            # must be told that late tasks need the rendered site, also
+            # when they are named on the command line.
+            for task in latetasks:
+                task.task_dep.append('render_site')
         return tasks + latetasks, DOIT_CONFIG
 
 
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2014 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""doit dependency managers and backends for Nikola's builds.
+
+Tasks are checked by doit's own dependency manager, with a CachedDB
+between it and the backend, so each file is stat'ed and hashed once per
+build however many tasks depend on it.  With ``FILE_DEP_CHECK =
+'timestamp'`` a TimestampDB is used instead.  These rely on the classes
+doit < 0.28 uses for its backends (DependencyBase and backend_map).
+
+doit's default backend keeps the state of every task in one dbm file,
+which is read and written as a whole and is lost if a build does not
+finish.  SqliteDB keeps one row per task in a SQLite database in
+write-ahead log mode.  Rows are read when a task is checked, and the
+tasks that changed are written in batches, so an interrupted build keeps
+everything but its last batch.
+
+The database is named like doit's file, with a ``.sqlite`` extension
+(``.doit.sqlite``).  When it does not exist yet, the state in the
+``.db`` file of the same name is imported, so switching backends does
+not rebuild the site.
+"""
+
+from __future__ import unicode_literals
+import json
+import os
+import sqlite3
+try:
+    import dbm
+    from dbm import whichdb
+except ImportError:  # Python 2
+    import anydbm as dbm  # NOQA
+    from whichdb import whichdb  # NOQA
+
+from doit.dependency import (DatabaseException, DependencyBase, DbmDB, JsonDB,
+                             backend_map, get_file_md5)
+
+from .utils import LOGGER, CacheStats, bytes_str, unicode_str
+
+__all__ = ['SqliteDB', 'SqliteDependency', 'CachedDB', 'TimestampDB', 'CachedDependency',
+           'BACKENDS', 'CHECKS', 'doit_backend']
+
+
+class SqliteDB(object):
+
+    """A doit backend storing the state of each task in a SQLite row.
+
+    Values are encoded in JSON, like doit's own backends do.  Decoded
+    rows are kept in memory; modified and removed tasks are written
+    every batch_size tasks and when the database is closed.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, name, import_from=None):
+        self.name = name
+        new = not os.path.exists(name)
+        self._conn = sqlite3.connect(name)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS doit ('
+                               'task_id TEXT NOT NULL PRIMARY KEY, '
+                               'task_data TEXT)')
+        except sqlite3.DatabaseError as e:
+            raise DatabaseException(
+                'Dependencies file {0!r} is corrupted or not a SQLite '
+                'database, remove it and a new one will be generated '
+                '({1})'.format(name, e))
+        self._db = {}
+        self.dirty = set()
+        self.removed = set()
+        if new and import_from:
+            self.import_db(import_from)
+
+    def import_db(self, name):
+        """Import the tasks in a file written by doit's dbm or json backends."""
+        rows = []
+        if whichdb(name):
+            old = dbm.open(name, 'r')
+            try:
+                for task_id in old.keys():
+                    rows.append((task_id.decode('utf-8'), old[task_id].decode('utf-8')))
+            finally:
+                old.close()
+        elif os.path.isfile(name):
+            try:
+                with open(name, 'rb') as inf:
+                    data = json.loads(inf.read().decode('utf-8'))
+            except ValueError:
+                LOGGER.warn('Could not import the tasks in {0}'.format(name))
+                return 0
+            rows = [(task_id, json.dumps(value)) for task_id, value in data.items()]
+        if rows:
+            with self._conn:
+                self._conn.executemany('INSERT OR REPLACE INTO doit VALUES (?, ?)', rows)
+            LOGGER.info('Imported {0} tasks from {1} into {2}'.format(
+                len(rows), name, self.name))
+        return len(rows)
+
+    def _task_data(self, task_id):
+        if task_id in self._db:
+            return self._db[task_id]
+        data = None
+        if task_id not in self.removed:
+            row = self._conn.execute('SELECT task_data FROM doit WHERE task_id=?',
+                                     (task_id,)).fetchone()
+            if row is not None:
+                data = json.loads(row[0])
+        self._db[task_id] = data
+        return data
+
+    def get(self, task_id, dependency):
+        """Get a value stored in the DB, or None."""
+        data = self._task_data(task_id)
+        if data is None:
+            return None
+        return data.get(dependency, None)
+
+    def set(self, task_id, dependency, value):
+        """Store a value in the DB."""
+        data = self._task_data(task_id)
+        if data is None:
+            data = self._db[task_id] = {}
+        data[dependency] = value
+        self.removed.discard(task_id)
+        self.dirty.add(task_id)
+        if len(self.dirty) >= self.batch_size:
+            self.flush()
+
+    def in_(self, task_id):
+        """Tell if the DB has values for task_id."""
+        return self._task_data(task_id) is not None
+
+    def remove(self, task_id):
+        """Remove the values of task_id."""
+        self._db[task_id] = None
+        self.dirty.discard(task_id)
+        self.removed.add(task_id)
+
+    def remove_all(self):
+        """Remove the values of every task."""
+        self._db = {}
+        self.dirty = set()
+        self.removed = set()
+        with self._conn:
+            self._conn.execute('DELETE FROM doit')
+
+    def flush(self):
+        """Write the modified and removed tasks in one transaction."""
+        if not (self.dirty or self.removed):
+            return
+        with self._conn:
+            self._conn.executemany('DELETE FROM doit WHERE task_id=?',
+                                   [(task_id,) for task_id in self.removed])
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO doit VALUES (?, ?)',
+                [(task_id, json.dumps(self._db[task_id])) for task_id in self.dirty])
+        self.dirty = set()
+        self.removed = set()
+
+    def dump(self):
+        """Write pending changes and close the DB."""
+        self.flush()
+        self._conn.close()
+
+
+def open_db(db_class, name):
+    """Open a doit DB, importing .db files into new .sqlite ones."""
+    if db_class is SqliteDB and name.endswith('.sqlite'):
+        return SqliteDB(name, name[:-len('.sqlite')] + '.db')
+    return db_class(name)
+
+
+class SqliteDependency(DependencyBase):
+
+    """Task dependency manager with the SqliteDB backend."""
+
+    def __init__(self, name):
+        DependencyBase.__init__(self, open_db(SqliteDB, name))
+
+
+class CachedDB(object):
+
+    """A doit DB that checks each file_dep once per build.
+
+    A template or a post source is a file_dep of hundreds of tasks.
+    doit reads the saved state of a file, (time, size, MD5), and if the
+    time changed it hashes the file again, for each of these tasks.
+    CachedDB wraps the DB given to doit's dependency manager: when it
+    returns the state of a file whose time changed, the file is stat'ed
+    and hashed once for the whole build.  If its contents are the saved
+    ones, the state is returned with the current time, and doit finds
+    the file unchanged; if they are not, None is returned, and doit
+    finds it modified.  doit still stats every file_dep itself, so a
+    file changed after it was hashed here is seen as changed.
+
+    Checks that were avoided are counted in stat_stats and md5_stats.
+    """
+
+    stat_stats = CacheStats('file_dep stat')
+    md5_stats = CacheStats('file_dep md5')
+
+    def __init__(self, db):
+        self.db = db
+        self.stat_cache = {}
+        self.md5_cache = {}
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def stat(self, path):
+        """Return the (mtime, size) of path."""
+        try:
+            value = self.stat_cache[path]
+        except KeyError:
+            self.stat_stats.misses += 1
+            file_stat = os.stat(path)
+            value = self.stat_cache[path] = (file_stat.st_mtime, file_stat.st_size)
+        else:
+            self.stat_stats.hits += 1
+        return value
+
+    def file_md5(self, path):
+        """Return the MD5 of path."""
+        signature = self.stat(path)
+        cached = self.md5_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            self.md5_stats.hits += 1
+            return cached[1]
+        self.md5_stats.misses += 1
+        file_md5 = get_file_md5(path)
+        self.md5_cache[path] = (signature, file_md5)
+        return file_md5
+
+    def forget(self, path):
+        """Stat and hash path again, after a task wrote it."""
+        self.stat_cache.pop(path, None)
+        self.md5_cache.pop(path, None)
+
+    def is_saved(self, state, timestamp, size):
+        """Tell if the saved state of a file is up to date, as doit does."""
+        return state[0] == timestamp
+
+    def get(self, task_id, dependency):
+        """Get a value stored in the DB, checking the states of files."""
+        state = self.db.get(task_id, dependency)
+        # The keys of doit's own values end with ':', the others are files
+        if state is None or dependency.endswith(':') or not _is_file_state(state):
+            return state
+        try:
+            timestamp, size = self.stat_cache[dependency]
+            self.stat_stats.hits += 1
+        except KeyError:
+            try:
+                timestamp, size = self.stat(dependency)
+            except OSError:  # doit reports missing files
+                return state
+        if self.is_saved(state, timestamp, size):
+            return state
+        if state[1] != size or state[2] != self.file_md5(dependency):
+            return None
+        return self.touched(task_id, dependency, [timestamp, size, state[2]])
+
+    def touched(self, task_id, dependency, state):
+        """Return the state of a file whose time changed, but not its contents."""
+        return state
+
+    def save_states(self, task):
+        """Save the states of the files of task after it ran.
+
+        doit's save_success then finds them up to date, and only saves
+        the rest of the state of the task.
+        """
+        for target in task.targets:
+            self.forget(target)
+        for dep in task.file_dep:
+            timestamp, size = self.stat(dep)
+            state = self.db.get(task.name, dep)
+            if state is None or not self.is_saved(state, timestamp, size):
+                self.db.set(task.name, dep, [timestamp, size, self.file_md5(dep)])
+
+
+class TimestampDB(CachedDB):
+
+    """A CachedDB checking files by time and size.
+
+    doit keeps the old time of a file whose contents did not change, so
+    after a checkout or a copy every build hashes the whole tree again.
+    Here a file is unchanged if its time and size are the saved ones.
+    If only the time changed the file is hashed, and if the contents
+    are the same the new time is saved.
+    """
+
+    def is_saved(self, state, timestamp, size):
+        return state[0] == timestamp and state[1] == size
+
+    def touched(self, task_id, dependency, state):
+        self.db.set(task_id, dependency, state)
+        return state
+
+
+def _is_file_state(value):
+    """Tell if value is the (time, size, MD5) doit saves for a file_dep."""
+    return isinstance(value, (list, tuple)) and len(value) == 3
+
+
+class CachedDependency(DependencyBase):
+
+    """doit's dependency manager, checking each file once per build.
+
+    Subclasses set db_class to the doit backend to use, and checker to
+    CachedDB or TimestampDB.
+    """
+
+    db_class = None
+    checker = CachedDB
+
+    def __init__(self, name):
+        DependencyBase.__init__(self, self.checker(open_db(self.db_class, name)))
+
+    def save_success(self, task):
+        """Save the state of task after it ran."""
+        self.backend.save_states(task)
+        DependencyBase.save_success(self, task)
+
+
+# DEPENDENCY_BACKEND values, with their doit DB and file
+BACKENDS = {
+    'dbm': (DbmDB, '.doit.db'),
+    'json': (JsonDB, '.doit.db'),
+    'sqlite': (SqliteDB, '.doit.sqlite'),
+}
+
+# FILE_DEP_CHECK values
+CHECKS = {
+    'md5': CachedDB,
+    'timestamp': TimestampDB,
+}
+
+backend_map['nikola-sqlite'] = SqliteDependency
+for _backend, (_db_class, _) in BACKENDS.items():
+    for _check, _checker in CHECKS.items():
+        backend_map['nikola-{0}-{1}'.format(_backend, _check)] = type(
+            str('{0}{1}Dependency'.format(_db_class.__name__, _check.title())),
+            (CachedDependency,), {'db_class': _db_class, 'checker': _checker})
+
+
+def doit_backend(backend, file_dep_check):
+    """Return the doit backend and DB file for DEPENDENCY_BACKEND and FILE_DEP_CHECK."""
+    return 'nikola-{0}-{1}'.format(backend, file_dep_check), BACKENDS[backend][1]
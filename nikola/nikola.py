@@ -30,7 +30,6 @@ from collections import defaultdict
 from copy import copy
 from pkg_resources import resource_filename
 import datetime
-import glob
 import locale
 import os
 import sys
@@ -65,7 +64,7 @@ DEFAULT_READ_MORE_LINK = '<p class="more"><a href="{link}">{read_more}…</a></p
 # Default pattern for translation files' names
 DEFAULT_TRANSLATIONS_PATTERN = '{path}.{lang}.{ext}'
 
-from .post import Post
+from .post import Post, MetadataIndex
 from . import utils
 from .plugin_categories import (
     Command,
@@ -85,6 +84,8 @@ config_changed = utils.config_changed
 
 __all__ = ['Nikola']
 
+url_cache_stats = utils.CacheStats('Nikola.url_replacer')
+
 # We store legal values for some setting here.  For internal use.
 LEGAL_VALUES = {
     'COMMENT_SYSTEM': [
@@ -173,6 +174,8 @@ class Nikola(object):
         'planetoid',
         'ipynb',
     ]
+    # How many links url_replacer remembers
+    URL_CACHE_SIZE = 20000
 
     def __init__(self, **config):
         """Setup proper environment for running tasks."""
@@ -192,11 +195,16 @@ class Nikola(object):
         self.posts_per_tag = defaultdict(list)
         self.posts_per_category = defaultdict(list)
         self.post_per_file = {}
+        self.posts_per_slug = {}
+        self.posts_per_source = defaultdict(list)
+        self._posts_views = {}
+        self._url_cache = utils.LRUCache(self.URL_CACHE_SIZE, url_cache_stats)
         self.timeline = []
         self.pages = []
         self._scanned = False
         self._template_system = None
         self._THEMES = None
+        self._MESSAGES = None
         self.debug = DEBUG
         self.loghandlers = []
         self.colorful = config.pop('__colorful__', False)
@@ -221,6 +229,7 @@ class Nikola(object):
             'BLOG_DESCRIPTION': 'Default Description',
             'BODY_END': "",
             'CACHE_FOLDER': 'cache',
+            'CACHE_METADATA': True,
             'CODE_COLOR_SCHEME': 'default',
             'COMMENT_SYSTEM': 'disqus',
             'COMMENTS_IN_GALLERIES': False,
@@ -242,9 +251,11 @@ class Nikola(object):
             'CREATE_SINGLE_ARCHIVE': False,
             'DATE_FORMAT': '%Y-%m-%d %H:%M',
             'DEFAULT_LANG': "en",
+            'DEPENDENCY_BACKEND': 'dbm',
             'DEPLOY_COMMANDS': [],
             'DISABLED_PLUGINS': (),
             'EXTRA_PLUGINS_DIRS': [],
+            'FILE_DEP_CHECK': 'md5',
             'COMMENT_SYSTEM_ID': 'nikolademo',
             'ENABLED_EXTRAS': (),
             'EXTRA_HEAD_DATA': '',
@@ -321,6 +332,7 @@ class Nikola(object):
             'SCHEDULE_ALL': False,
             'SCHEDULE_RULE': '',
             'SCHEDULE_FORCE_TODAY': False,
+            'SCAN_POSTS_WORKERS': 1,
             'LOGGING_HANDLERS': {'stderr': {'loglevel': 'WARNING', 'bubble': True}},
             'DEMOTE_HEADERS': 1,
         }
@@ -431,6 +443,8 @@ class Nikola(object):
 
         self.default_lang = self.config['DEFAULT_LANG']
         self.translations = self.config['TRANSLATIONS']
+        self.source_index = utils.SourceIndex(self.config)
+        self.translation_resolver = utils.get_translation_resolver(self.config)
 
         locale_fallback, locale_default, locales = sanitized_locales(
                                     self.config.get('LOCALE_FALLBACK', None),
@@ -528,9 +542,7 @@ class Nikola(object):
         for compiler, exts in self.config['COMPILERS'].items():
             for ext in exts:
                 compilers[compiler].add(ext)
-                for lang in self.config['TRANSLATIONS'].keys():
-                    candidate = utils.get_translation_candidate(self.config, "f" + ext, lang)
-                    compilers[compiler].add(candidate)
+                compilers[compiler].update(self.translation_resolver.candidates("f" + ext).values())
 
         # Avoid redundant compilers
         for k, v in compilers.items():
@@ -630,13 +642,17 @@ class Nikola(object):
     THEMES = property(_get_themes)
 
     def _get_messages(self):
-        try:
-            return utils.load_messages(self.THEMES,
-                                       self.translations,
-                                       self.default_lang)
-        except utils.LanguageNotFoundError as e:
-            utils.LOGGER.error('''Cannot load language "{0}".  Please make sure it is supported by Nikola itself, or that you have the appropriate messages files in your themes.'''.format(e.lang))
-            sys.exit(1)
+        # Loading the catalog imports and reloads every messages module of
+        # every theme, so it's done only once and the result is shared.
+        if self._MESSAGES is None:
+            try:
+                self._MESSAGES = utils.load_messages(self.THEMES,
+                                                     self.translations,
+                                                     self.default_lang)
+            except utils.LanguageNotFoundError as e:
+                utils.LOGGER.error('''Cannot load language "{0}".  Please make sure it is supported by Nikola itself, or that you have the appropriate messages files in your themes.'''.format(e.lang))
+                sys.exit(1)
+        return self._MESSAGES
 
     MESSAGES = property(_get_messages)
 
@@ -757,49 +773,68 @@ class Nikola(object):
         dst is the link to be mangled
         lang is used for language-sensitive URLs in link://
 
+        """
+        if lang is None:
+            lang = self.default_lang
+        # The result only depends on the folder of src, unless dst points
+        # to src itself (see _url_replacer)
+        key = (src.rpartition('/')[0], dst, lang, self.config.get('URL_TYPE'))
+        cached = self._url_cache.get(key)
+        if cached is not None and cached[0] != src:
+            return cached[1]
+        result, normalized = self._url_replacer(src, dst, lang)
+        if normalized is not None and normalized != src:
+            self._url_cache[key] = (normalized, result)
+        return result
+
+    def _url_replacer(self, src, dst, lang):
+        """Do the work of url_replacer.
+
+        Returns the new link and dst made absolute, which is None if
+        the new link depends on more than the folder of src.
         """
         parsed_src = urlsplit(src)
         src_elems = parsed_src.path.split('/')[1:]
         dst_url = urlparse(dst)
-        if lang is None:
-            lang = self.default_lang
 
         # Refuse to replace links that are full URLs.
         if dst_url.netloc:
             if dst_url.scheme == 'link':  # Magic link
                 dst = self.link(dst_url.netloc, dst_url.path.lstrip('/'), lang)
             else:
-                return dst
+                return dst, dst
         elif dst_url.scheme == 'link':  # Magic absolute path link:
             dst = dst_url.path
-            return dst
+            return dst, dst
 
         # Refuse to replace links that consist of a fragment only
         if ((not dst_url.scheme) and (not dst_url.netloc) and
                 (not dst_url.path) and (not dst_url.params) and
                 (not dst_url.query) and dst_url.fragment):
-            return dst
+            return dst, dst
 
         # Normalize
         dst = urljoin(src, dst)
+        # Links without a path (like "?q=1") are relative to src itself
+        normalized = dst if (dst_url.netloc or dst_url.path) else None
 
         # Avoid empty links.
         if src == dst:
             if self.config.get('URL_TYPE') == 'absolute':
                 dst = urljoin(self.config['BASE_URL'], dst.lstrip('/'))
-                return dst
+                return dst, None
             elif self.config.get('URL_TYPE') == 'full_path':
                 dst = urljoin(self.config['BASE_URL'], dst.lstrip('/'))
-                return urlparse(dst).path
+                return urlparse(dst).path, None
             else:
-                return "#"
+                return "#", None
 
         # Check that link can be made relative, otherwise return dest
         parsed_dst = urlsplit(dst)
         if parsed_src[:2] != parsed_dst[:2]:
             if self.config.get('URL_TYPE') == 'absolute':
                 dst = urljoin(self.config['BASE_URL'], dst)
-            return dst
+            return dst, normalized
 
         if self.config.get('URL_TYPE') in ('full_path', 'absolute'):
             dst = urljoin(self.config['BASE_URL'], dst.lstrip('/'))
@@ -809,7 +844,7 @@ class Nikola(object):
                     dst = '{0}#{1}'.format(parsed.path, parsed.fragment)
                 else:
                     dst = parsed.path
-            return dst
+            return dst, normalized
 
         # Now both paths are on the same site and absolute
         dst_elems = parsed_dst.path.split('/')[1:]
@@ -830,7 +865,7 @@ class Nikola(object):
 
         assert result, (src, dst, i, src_elems, dst_elems)
 
-        return result
+        return result, normalized
 
     def generic_rss_renderer(self, lang, title, link, description, timeline, output_path,
                              rss_teasers, rss_plain, feed_length=10, feed_url=None):
@@ -956,7 +991,8 @@ class Nikola(object):
 
     def slug_path(self, name, lang):
         """slug path handler"""
-        results = [p for p in self.timeline if p.meta('slug') == name]
+        slugs = self.posts_per_slug.get(utils.LocaleBorg().current_lang, {})
+        results = slugs.get(name, [])
         if not results:
             utils.LOGGER.warning("Cannot resolve path request for slug: {0}".format(name))
         else:
@@ -966,7 +1002,7 @@ class Nikola(object):
 
     def filename_path(self, name, lang):
         """filename path handler"""
-        results = [p for p in self.timeline if p.source_path == name]
+        results = self.posts_per_source.get(name, [])
         if not results:
             utils.LOGGER.warning("Cannot resolve path request for filename: {0}".format(name))
         else:
@@ -1063,6 +1099,41 @@ class Nikola(object):
             'task_dep': task_dep
         }
 
+    def posts_view(self, lang=None, kind='posts', key=None):
+        """Return a list of posts, newest first, that can be shown in lang.
+
+        kind is one of 'posts', 'pages', 'tag', 'category', 'year' or
+        'month', and key is the tag, category, year or month for the last
+        four.  Unless SHOW_UNTRANSLATED_POSTS is set, only posts translated
+        to lang are included; if lang is None all posts are.
+
+        The lists are built once after each scan and shared, so they must
+        not be modified.
+        """
+        view_key = (lang, kind, key)
+        if view_key in self._posts_views:
+            return self._posts_views[view_key]
+        if lang is not None and not self.config['SHOW_UNTRANSLATED_POSTS']:
+            posts = [p for p in self.posts_view(None, kind, key)
+                     if p.is_translation_available(lang)]
+        elif lang is not None:
+            posts = self.posts_view(None, kind, key)
+        elif kind == 'posts':
+            posts = self.posts
+        elif kind == 'pages':
+            posts = self.pages
+        else:
+            source = {
+                'tag': self.posts_per_tag,
+                'category': self.posts_per_category,
+                'year': self.posts_per_year,
+                'month': self.posts_per_month,
+            }[kind].get(key, [])
+            posts = sorted(source, key=lambda p: p.date)
+            posts.reverse()
+        self._posts_views[view_key] = posts
+        return posts
+
     def scan_posts(self, really=False):
         """Scan all the posts."""
         if self._scanned and not really:
@@ -1075,38 +1146,57 @@ class Nikola(object):
         self.posts_per_tag = defaultdict(list)
         self.posts_per_category = defaultdict(list)
         self.post_per_file = {}
+        self.posts_per_slug = {}
+        self.posts_per_source = defaultdict(list)
+        self._posts_views = {}
+        self._url_cache.clear()
         self.timeline = []
         self.pages = []
 
+        # Every source folder is listed exactly once, everything else
+        # about source files is then looked up in this index.
+        self.source_index = utils.SourceIndex(self.config)
+
+        if self.config['CACHE_METADATA']:
+            metadata_index = MetadataIndex(
+                os.path.join(self.config['CACHE_FOLDER'], 'metadata_index.json'),
+                self.config, self.source_index)
+        elif self.config['SCAN_POSTS_WORKERS'] > 1:
+            metadata_index = MetadataIndex(None, self.config, self.source_index)
+        else:
+            metadata_index = None
+
         seen = set([])
         print("Scanning posts", end='', file=sys.stderr)
         slugged_tags = set([])
         quit = False
+        sources = []
         for wildcard, destination, template_name, use_in_feeds in \
                 self.config['post_pages']:
             print(".", end='', file=sys.stderr)
             dirname = os.path.dirname(wildcard)
-            for dirpath, _, _ in os.walk(dirname, followlinks=True):
+            for dirpath, _, filenames in os.walk(dirname, followlinks=True):
+                self.source_index.add_folder(dirpath, filenames)
                 dest_dir = os.path.normpath(os.path.join(destination,
                                             os.path.relpath(dirpath, dirname)))  # output/destination/foo/
                 # Get all the untranslated paths
-                dir_glob = os.path.join(dirpath, os.path.basename(wildcard))  # posts/foo/*.rst
-                untranslated = glob.glob(dir_glob)
+                file_glob = os.path.basename(wildcard)  # *.rst
+                untranslated = self.source_index.glob(dirpath, file_glob)  # posts/foo/*.rst
                 # And now get all the translated paths
                 translated = set([])
                 for lang in self.config['TRANSLATIONS'].keys():
                     if lang == self.config['DEFAULT_LANG']:
                         continue
-                    lang_glob = utils.get_translation_candidate(self.config, dir_glob, lang)  # posts/foo/*.LANG.rst
-                    translated = translated.union(set(glob.glob(lang_glob)))
+                    lang_glob = self.translation_resolver.candidate(file_glob, lang)  # *.LANG.rst
+                    translated = translated.union(set(self.source_index.glob(dirpath, lang_glob)))
                 # untranslated globs like *.rst often match translated paths too, so remove them
                 # and ensure x.rst is not in the translated set
                 untranslated = set(untranslated) - translated
 
                 # also remove from translated paths that are translations of
                 # paths in untranslated_list, so x.es.rst is not in the untranslated set
-                for p in untranslated:
-                    translated = translated - set([utils.get_translation_candidate(self.config, p, l) for l in self.config['TRANSLATIONS'].keys()])
+                for candidates in self.translation_resolver.batch(untranslated):
+                    translated = translated - set(candidates.values())
 
                 full_list = list(translated) + list(untranslated)
                 # We eliminate from the list the files inside any .ipynb folder
@@ -1119,40 +1209,51 @@ class Nikola(object):
                         continue
                     else:
                         seen.add(base_path)
-                    post = Post(
-                        base_path,
-                        self.config,
-                        dest_dir,
-                        use_in_feeds,
-                        self.MESSAGES,
-                        template_name,
-                        self.get_compiler(base_path)
-                    )
-                    self.timeline.append(post)
-                    self.global_data[post.source_path] = post
-                    if post.use_in_feeds:
-                        self.posts.append(post)
-                        self.posts_per_year[
-                            str(post.date.year)].append(post)
-                        self.posts_per_month[
-                            '{0}/{1:02d}'.format(post.date.year, post.date.month)].append(post)
-                        for tag in post.alltags:
-                            if utils.slugify(tag) in slugged_tags:
-                                if tag not in self.posts_per_tag:
-                                    # Tags that differ only in case
-                                    other_tag = [k for k in self.posts_per_tag.keys() if k.lower() == tag.lower()][0]
-                                    utils.LOGGER.error('You have tags that are too similar: {0} and {1}'.format(tag, other_tag))
-                                    utils.LOGGER.error('Tag {0} is used in: {1}'.format(tag, post.source_path))
-                                    utils.LOGGER.error('Tag {0} is used in: {1}'.format(other_tag, ', '.join([p.source_path for p in self.posts_per_tag[other_tag]])))
-                                    quit = True
-                            else:
-                                slugged_tags.add(utils.slugify(tag))
-                            self.posts_per_tag[tag].append(post)
-                        self.posts_per_category[post.meta('category')].append(post)
+                    sources.append((base_path, dest_dir, use_in_feeds, template_name))
+
+        # Metadata parsing is the expensive part, do it in parallel if asked
+        # to.  Posts are still created in order, so the result is the same.
+        if self.config['SCAN_POSTS_WORKERS'] > 1:
+            metadata_index.update([source[0] for source in sources],
+                                  self.config['SCAN_POSTS_WORKERS'])
+
+        for base_path, dest_dir, use_in_feeds, template_name in sources:
+            post = Post(
+                base_path,
+                self.config,
+                dest_dir,
+                use_in_feeds,
+                self.MESSAGES,
+                template_name,
+                self.get_compiler(base_path),
+                metadata_index,
+                self.source_index
+            )
+            self.timeline.append(post)
+            self.global_data[post.source_path] = post
+            if post.use_in_feeds:
+                self.posts.append(post)
+                self.posts_per_year[
+                    str(post.date.year)].append(post)
+                self.posts_per_month[
+                    '{0}/{1:02d}'.format(post.date.year, post.date.month)].append(post)
+                for tag in post.alltags:
+                    if utils.slugify(tag) in slugged_tags:
+                        if tag not in self.posts_per_tag:
+                            # Tags that differ only in case
+                            other_tag = [k for k in self.posts_per_tag.keys() if k.lower() == tag.lower()][0]
+                            utils.LOGGER.error('You have tags that are too similar: {0} and {1}'.format(tag, other_tag))
+                            utils.LOGGER.error('Tag {0} is used in: {1}'.format(tag, post.source_path))
+                            utils.LOGGER.error('Tag {0} is used in: {1}'.format(other_tag, ', '.join([p.source_path for p in self.posts_per_tag[other_tag]])))
+                            quit = True
                     else:
-                        self.pages.append(post)
-                    self.post_per_file[post.destination_path(lang=lang)] = post
-                    self.post_per_file[post.destination_path(lang=lang, extension=post.source_ext())] = post
+                        slugged_tags.add(utils.slugify(tag))
+                    self.posts_per_tag[tag].append(post)
+                self.posts_per_category[post.meta('category')].append(post)
+            else:
+                self.pages.append(post)
+            self.post_per_file[post.destination_path(lang=lang)] = post
+            self.post_per_file[post.destination_path(lang=lang, extension=post.source_ext())] = post
 
         # Sort everything.
         self.timeline.sort(key=lambda p: p.date)
@@ -1166,6 +1267,39 @@ class Nikola(object):
             p.next_post = self.posts[i]
         for i, p in enumerate(self.posts[:-1]):
             p.prev_post = self.posts[i + 1]
+
+        if not self.config['SHOW_UNTRANSLATED_POSTS']:
+            # Neighbors skip posts that are not translated to the language,
+            # find them once for every language instead of on each lookup.
+            for p in self.posts:
+                p.translated_neighbors = {}
+            for lang in self.config['TRANSLATIONS']:
+                translated = [p.is_translation_available(lang) for p in self.posts]
+                prev_posts = []
+                prev_post = None
+                for p, available in zip(reversed(self.posts), reversed(translated)):
+                    prev_posts.append(prev_post)
+                    if available:
+                        prev_post = p
+                prev_posts.reverse()
+                next_post = None
+                for p, available, prev_post in zip(self.posts, translated, prev_posts):
+                    if prev_post is not p._prev_post or next_post is not p._next_post:
+                        p.translated_neighbors[lang] = (prev_post, next_post)
+                    if available:
+                        next_post = p
+
+        # Indexes for the slug and filename path handlers, in timeline order.
+        # Slugs can be translated, so there is one slug index per language.
+        for lang in self.config['TRANSLATIONS']:
+            self.posts_per_slug[lang] = defaultdict(list)
+        for p in self.timeline:
+            self.posts_per_source[p.source_path].append(p)
+            for lang, slugs in self.posts_per_slug.items():
+                slugs[p.meta[lang]['slug']].append(p)
+
+        if metadata_index is not None:
+            metadata_index.save()
         self._scanned = True
         print("done!", file=sys.stderr)
         if quit:
@@ -1220,7 +1354,8 @@ class Nikola(object):
                                    template_name, filters, extra_context):
         """Renders pages with lists of posts."""
 
-        deps = self.template_system.template_deps(template_name)
+        # A new list: template_deps may return the one it keeps
+        deps = list(self.template_system.template_deps(template_name))
         for post in posts:
             deps += post.deps(lang)
         context = {}
@@ -73,8 +73,11 @@ class Archive(Task):
                 context["permalink"] = self.site.link("archive", year, lang)
                 if not kw["create_monthly_archive"]:
                     template_name = "list_post.tmpl"
-                    post_list = sorted(posts, key=lambda a: a.date)
-                    post_list.reverse()
+                    if year:
+                        post_list = self.site.posts_view(None, 'year', year)
+                    else:
+                        post_list = sorted(posts, key=lambda a: a.date)
+                        post_list.reverse()
                     context["posts"] = post_list
                 else:  # Monthly archives, just list the months
                     months = set([m.split('/')[1] for m in self.site.posts_per_month.keys() if m.startswith(str(year))])
@@ -105,8 +108,7 @@ class Archive(Task):
                     kw['output_folder'], self.site.path("archive", yearmonth,
                                                         lang))
                 year, month = yearmonth.split('/')
-                post_list = sorted(posts, key=lambda a: a.date)
-                post_list.reverse()
+                post_list = self.site.posts_view(None, 'month', yearmonth)
                 context = {}
                 context["lang"] = lang
                 context["posts"] = post_list
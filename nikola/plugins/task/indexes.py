@@ -62,14 +62,10 @@ class Indexes(Task):
         }
 
         template_name = "index.tmpl"
-        posts = self.site.posts
         for lang in kw["translations"]:
             # Split in smaller lists
             lists = []
-            if kw["show_untranslated_posts"]:
-                filtered_posts = posts
-            else:
-                filtered_posts = [x for x in posts if x.is_translation_available(lang)]
+            filtered_posts = self.site.posts_view(lang)
             lists.append(filtered_posts[:kw["index_display_post_count"]])
             filtered_posts = filtered_posts[kw["index_display_post_count"]:]
             while filtered_posts:
@@ -52,6 +52,7 @@ class RenderPosts(Task):
             "timeline": self.site.timeline,
             "default_lang": self.site.config["DEFAULT_LANG"],
             "show_untranslated_posts": self.site.config['SHOW_UNTRANSLATED_POSTS'],
+            "hyphenate": self.site.config['HYPHENATE'],
         }
 
         yield self.group_task()
@@ -61,11 +62,15 @@ class RenderPosts(Task):
             deps_dict.pop('timeline')
             for post in kw['timeline']:
                 dest = post.translated_base_path(lang)
+                targets = [dest]
+                if post.is_translation_available(lang):
+                    # Written by post.compile
+                    targets.append(post.fragment_info_path(lang))
                 task = {
                     'basename': self.name,
                     'name': dest,
                     'file_dep': post.fragment_deps(lang),
-                    'targets': [dest],
+                    'targets': targets,
                     'actions': [(post.compile, (lang, )),
                                 (rest_deps, (post,)),
                                 ],
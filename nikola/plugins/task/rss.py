@@ -71,10 +71,7 @@ class GenerateRSS(Task):
             output_name = os.path.join(kw['output_folder'],
                                        self.site.path("rss", None, lang))
             deps = []
-            if kw["show_untranslated_posts"]:
-                posts = self.site.posts[:10]
-            else:
-                posts = [x for x in self.site.posts if x.is_translation_available(lang)][:10]
+            posts = self.site.posts_view(lang)[:10]
             for post in posts:
                 deps += post.deps(lang)
 
@@ -141,7 +141,9 @@ class Sitemap(LateTask):
 
         def write_sitemap():
             # Have to rescan, because files may have been added between
-            # task dep scanning and task execution
+            # task dep scanning and task execution (and in parallel builds,
+            # _scan_locs ran in another process)
+            scan_locs()
             with codecs.open(sitemap_path, 'wb+', 'utf8') as outf:
                 outf.write(header)
                 for k in sorted(locs.keys()):
@@ -66,10 +66,10 @@ class Sources(Task):
                     if dest_ext == post.source_ext():
                         continue
                     if lang != kw["default_lang"]:
-                        source_lang = utils.get_translation_candidate(self.site.config, source, lang)
-                        if os.path.exists(source_lang):
+                        source_lang = self.site.translation_resolver.candidate(source, lang)
+                        if self.site.source_index.exists(source_lang):
                             source = source_lang
-                    if os.path.isfile(source):
+                    if self.site.source_index.isfile(source):
                         yield {
                             'basename': 'render_sources',
                             'name': os.path.normpath(output_name),
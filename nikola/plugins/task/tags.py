@@ -83,13 +83,9 @@ class RenderTags(Task):
         cat_list = list(self.site.posts_per_category.items())
 
         def render_lists(tag, posts, is_category=True):
-            post_list = sorted(posts, key=lambda a: a.date)
-            post_list.reverse()
+            kind = "category" if is_category else "tag"
             for lang in kw["translations"]:
-                if kw["show_untranslated_posts"]:
-                    filtered_posts = post_list
-                else:
-                    filtered_posts = [x for x in post_list if x.is_translation_available(lang)]
+                filtered_posts = self.site.posts_view(lang, kind, tag)
                 yield self.tag_rss(tag, lang, filtered_posts, kw, is_category)
                 # Render HTML
                 if kw['tag_pages_are_indexes']:
@@ -109,12 +105,13 @@ class RenderTags(Task):
 
         # Tag cloud json file
         tag_cloud_data = {}
+        timeline = list(reversed(sorted(self.site.timeline, key=lambda post: post.date)))
         for tag, posts in self.site.posts_per_tag.items():
             tag_posts = dict(posts=[{'title': post.meta[post.default_lang]['title'],
                                      'date': post.date.strftime('%m/%d/%Y'),
                                      'isodate': post.date.isoformat(),
                                      'url': post.base_path.replace('cache', '')}
-                                    for post in reversed(sorted(self.site.timeline, key=lambda post: post.date))
+                                    for post in timeline
                                     if tag in post.alltags])
             tag_cloud_data[tag] = [len(posts), self.site.link(
                 'tag', tag, self.site.config['DEFAULT_LANG']), tag_posts]
@@ -26,6 +26,8 @@
 
 """Jinja template handlers"""
 
+import codecs
+import hashlib
 import os
 import json
 from collections import deque
@@ -36,7 +38,9 @@ except ImportError:
     jinja2 = None  # NOQA
 
 from nikola.plugin_categories import TemplateSystem
-from nikola.utils import makedirs, req_missing
+from nikola.utils import makedirs, req_missing, get_logger, STDERR_HANDLER
+
+LOGGER = get_logger('jinja', STDERR_HANDLER)
 
 
 class JinjaTemplates(TemplateSystem):
@@ -45,6 +49,11 @@ class JinjaTemplates(TemplateSystem):
     name = "jinja"
     lookup = None
     dependency_cache = {}
+    cache_dir = None
+    # {filename: [md5 of source, referenced templates]}, kept in deps_file
+    file_deps = None
+    deps_file = None
+    file_deps_changed = False
 
     def __init__(self):
         """ initialize Jinja2 wrapper with extended set of filters"""
@@ -57,12 +66,42 @@ class JinjaTemplates(TemplateSystem):
         self.lookup.globals['enumerate'] = enumerate
 
     def set_directories(self, directories, cache_folder):
-        """Create a template lookup."""
+        """Create a template lookup.
+
+        Compiled templates are kept in cache_folder across runs, in a
+        Jinja2 bytecode cache.  It checks the template source, so changed
+        templates are compiled again.
+        """
         if jinja2 is None:
             req_missing(['jinja2'], 'use this theme')
         self.directories = directories
+        self.cache_dir = os.path.join(cache_folder, '.jinja.tmp')
+        makedirs(self.cache_dir)
+        self.lookup.bytecode_cache = jinja2.FileSystemBytecodeCache(self.cache_dir)
+        self.load_file_deps()
         self.create_lookup()
 
+    def load_file_deps(self):
+        """Load the dependencies found by template_deps in earlier runs."""
+        self.deps_file = os.path.join(self.cache_dir, 'template_deps.json')
+        self.file_deps = {}
+        self.file_deps_changed = False
+        if os.path.isfile(self.deps_file):
+            try:
+                with codecs.open(self.deps_file, 'rb', 'utf8') as inf:
+                    self.file_deps = json.load(inf)
+            except ValueError:
+                LOGGER.warning('Ignoring broken template dependencies {0}'.format(self.deps_file))
+
+    def save_file_deps(self):
+        """Save the dependencies found by template_deps, if there are new ones."""
+        if not self.file_deps_changed:
+            return
+        makedirs(self.cache_dir)
+        with codecs.open(self.deps_file, 'wb+', 'utf8') as outf:
+            json.dump(self.file_deps, outf, sort_keys=True)
+        self.file_deps_changed = False
+
     def inject_directory(self, directory):
         """if it's not there, add the directory to the lookup with lowest priority, and
         recreate the lookup."""
@@ -109,12 +148,24 @@ class JinjaTemplates(TemplateSystem):
                 source, filename = self.lookup.loader.get_source(self.lookup,
                                                                  curr)[:2]
                 deps.append(filename)
-                ast = self.lookup.parse(source)
-                dep_names = meta.find_referenced_templates(ast)
-                for dep_name in dep_names:
+                for dep_name in self.get_deps(source, filename):
                     if (dep_name not in visited_templates
                             and dep_name is not None):
                         visited_templates.add(dep_name)
                         queue.append(dep_name)
             self.dependency_cache[template_name] = deps
-        return self.dependency_cache[template_name]
+            self.save_file_deps()
+        return list(self.dependency_cache[template_name])
+
+    def get_deps(self, source, filename):
+        """Return the names of the templates referenced by a template."""
+        digest = hashlib.md5(source.encode('utf-8')).hexdigest()
+        cached = self.file_deps.get(filename)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        ast = self.lookup.parse(source)
+        # None means a name only known when rendering, it is skipped
+        dep_names = list(meta.find_referenced_templates(ast))
+        self.file_deps[filename] = [digest, dep_names]
+        self.file_deps_changed = True
+        return dep_names
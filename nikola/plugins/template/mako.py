@@ -26,11 +26,17 @@
 
 """Mako template handlers"""
 from __future__ import unicode_literals, print_function, absolute_import
+import codecs
+import hashlib
+import json
 import os
+import posixpath
+import re
 import shutil
 import sys
 import tempfile
 
+import mako
 from mako import util, lexer
 from mako.lookup import TemplateLookup
 from mako.template import Template
@@ -52,8 +58,16 @@ class MakoTemplates(TemplateSystem):
     filters = {}
     directories = []
     cache_dir = None
+    # {filename: [mtime, size, deps]} for get_deps, kept in deps_file
+    file_deps = None
+    deps_file = None
+    file_deps_changed = False
 
     def get_deps(self, filename):
+        stat = os.stat(filename)
+        cached = self.file_deps.get(filename)
+        if cached is not None and cached[:2] == [stat.st_mtime, stat.st_size]:
+            return list(cached[2])
         text = util.read_file(filename)
         lex = lexer.Lexer(text=text, filename=filename)
         lex.parse()
@@ -64,24 +78,62 @@ class MakoTemplates(TemplateSystem):
             if keyword in ["inherit", "namespace"]:
                 deps.append(n.attributes['file'])
             # TODO: include tags are not handled
+        self.file_deps[filename] = [stat.st_mtime, stat.st_size, deps]
+        self.file_deps_changed = True
         return deps
 
     def set_directories(self, directories, cache_folder):
-        """Set directories and create a template lookup."""
-        cache_dir = os.path.join(cache_folder, '.mako.tmp')
+        """Set directories and create a template lookup.
+
+        Compiled templates are kept in cache_folder across runs, in a
+        folder for the running Mako version.  Their names include a hash
+        of the template source, so a changed or different template (for
+        example, from another theme) never uses a stale module.
+        """
+        base_dir = os.path.join(cache_folder, '.mako.tmp')
+        cache_dir = os.path.join(base_dir, 'mako-' + mako.__version__)
         # Workaround for a Mako bug, Issue #825
         if sys.version_info[0] == 2:
             try:
                 os.path.abspath(cache_dir).decode('ascii')
             except UnicodeEncodeError:
-                cache_dir = tempfile.mkdtemp()
+                base_dir = cache_dir = tempfile.mkdtemp()
                 LOGGER.warning('Because of a Mako bug, setting cache_dir to {0}'.format(cache_dir))
-        if os.path.exists(cache_dir):
-            shutil.rmtree(cache_dir)
+        if os.path.isdir(base_dir):
+            # Drop modules compiled by other Mako versions
+            for name in os.listdir(base_dir):
+                path = os.path.join(base_dir, name)
+                if path != cache_dir:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
         self.directories = directories
         self.cache_dir = cache_dir
+        self.load_file_deps()
         self.create_lookup()
 
+    def load_file_deps(self):
+        """Load the dependencies found by get_deps in earlier runs."""
+        self.deps_file = os.path.join(self.cache_dir, 'template_deps.json')
+        self.file_deps = {}
+        self.file_deps_changed = False
+        if os.path.isfile(self.deps_file):
+            try:
+                with codecs.open(self.deps_file, 'rb', 'utf8') as inf:
+                    self.file_deps = json.load(inf)
+            except ValueError:
+                LOGGER.warning('Ignoring broken template dependencies {0}'.format(self.deps_file))
+
+    def save_file_deps(self):
+        """Save the dependencies found by get_deps, if there are new ones."""
+        if not self.file_deps_changed:
+            return
+        makedirs(self.cache_dir)
+        with codecs.open(self.deps_file, 'wb+', 'utf8') as outf:
+            json.dump(self.file_deps, outf, sort_keys=True)
+        self.file_deps_changed = False
+
     def inject_directory(self, directory):
         """if it's not there, add the directory to the lookup with lowest priority, and
         recreate the lookup."""
@@ -93,9 +145,60 @@ class MakoTemplates(TemplateSystem):
         """Create a template lookup object."""
         self.lookup = TemplateLookup(
             directories=self.directories,
-            module_directory=self.cache_dir,
+            modulename_callable=self.module_filename,
             output_encoding='utf-8')
 
+    def module_filename(self, filename, uri):
+        """Return the path of the compiled module for template filename.
+
+        Modules are named after the uri, the md5 of filename and the md5
+        of the template.  If the template changed, the modules compiled
+        from its older versions are removed, so they don't pile up in the
+        cache; templates with the same uri in other folders are kept.
+        """
+        with open(filename, 'rb') as inf:
+            digest = hashlib.md5(inf.read()).hexdigest()
+        path_digest = hashlib.md5(filename.encode('utf-8')).hexdigest()
+        name = os.path.normpath(re.sub(r"^/+", "", uri.replace("\\", "/")))
+        path = os.path.join(self.cache_dir, '{0}.{1}.{2}.py'.format(name, path_digest, digest))
+        if not os.path.exists(path):
+            self.remove_modules(path, digest)
+        return path
+
+    def remove_modules(self, path, digest):
+        """Remove the modules in the folder of path compiled from other
+        versions of the same template file, and their bytecode.
+
+        The name of path up to digest identifies the template file.
+        """
+        folder, base = os.path.split(path)
+        prefix = base[:-len('.{0}.py'.format(digest))]
+        stale = re.compile(re.escape(prefix) +
+                           r'\.(?!{0})[0-9a-f]{{32}}\.(py[co]?|[^.]+\.pyc)$'.format(digest))
+        for folder in (folder, os.path.join(folder, '__pycache__')):
+            if not os.path.isdir(folder):
+                continue
+            for fname in os.listdir(folder):
+                if stale.match(fname):
+                    try:
+                        os.remove(os.path.join(folder, fname))
+                    except OSError:  # Removed by another process
+                        pass
+
+    def find_template(self, template_name):
+        """Return the file the lookup would load for template_name, or None.
+
+        This is the search done by TemplateLookup.get_template, without
+        loading the template.
+        """
+        uri = re.sub(r"^/+", "", template_name.replace("\\", "/"))
+        for directory in self.directories:
+            directory = directory.replace(os.path.sep, posixpath.sep)
+            filename = posixpath.normpath(posixpath.join(directory, uri))
+            if os.path.isfile(filename):
+                return filename
+        return None
+
     def set_site(self, site):
         """Sets the site."""
         self.site = site
@@ -121,14 +224,22 @@ class MakoTemplates(TemplateSystem):
 
     def template_deps(self, template_name):
         """Returns filenames which are dependencies for a template."""
+        deps = self._template_deps(template_name)
+        self.save_file_deps()
+        return deps
+
+    def _template_deps(self, template_name):
         # We can cache here because dependencies should
         # not change between runs
         if self.cache.get(template_name, None) is None:
-            template = self.lookup.get_template(template_name)
-            dep_filenames = self.get_deps(template.filename)
-            deps = [template.filename]
+            filename = self.find_template(template_name)
+            if filename is None:
+                # Let Mako report the missing template
+                filename = self.lookup.get_template(template_name).filename
+            dep_filenames = self.get_deps(filename)
+            deps = [filename]
             for fname in dep_filenames:
-                deps += self.template_deps(fname)
+                deps += self._template_deps(fname)
             self.cache[template_name] = tuple(deps)
         return list(self.cache[template_name])
 
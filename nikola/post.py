@@ -29,9 +29,13 @@ from __future__ import unicode_literals, print_function, absolute_import
 import codecs
 from collections import defaultdict
 import datetime
+import hashlib
+import json
+import multiprocessing
 import os
 import re
 import string
+import sys
 try:
     from urlparse import urljoin
 except ImportError:
@@ -51,27 +55,164 @@ from math import ceil
 import nikola.utils
 from .utils import (
     bytes_str,
+    CacheStats,
     current_time,
+    CustomEncoder,
     Functionary,
     LOGGER,
     LocaleBorg,
+    LRUCache,
     slugify,
     to_datetime,
     unicode_str,
     demote_headers,
     get_translation_candidate,
+    get_translation_resolver,
 )
 from .rc4 import rc4
 
 __all__ = ['Post']
 
+path_cache_stats = CacheStats('Post.permalink and Post.destination_path')
+text_cache_stats = CacheStats('Post.text')
+
 TEASER_REGEXP = re.compile('<!--\s*TEASER_END(:(.+))?\s*-->', re.IGNORECASE)
 
 
+def _no_metadata():
+    return None
+
+
+def _setting(name):
+    """Make a read-only Post attribute for a site-wide setting."""
+    return property(lambda self: getattr(self._settings, name))
+
+
+class PostSettings(object):
+
+    """The settings every Post of a site needs, shared by all of them.
+
+    Use get_post_settings to get the instance for a site configuration.
+    """
+
+    __slots__ = ('config', 'base_url', 'strip_indexes', 'index_file',
+                 'pretty_urls', 'translations', 'default_lang',
+                 'skip_untranslated', 'hyphenate', 'translation_resolver')
+
+    def __init__(self, config):
+        self.config = config
+        self.base_url = config['BASE_URL']
+        self.strip_indexes = config['STRIP_INDEXES']
+        self.index_file = config['INDEX_FILE']
+        self.pretty_urls = config['PRETTY_URLS']
+        self.translations = config['TRANSLATIONS']
+        self.default_lang = config['DEFAULT_LANG']
+        self.skip_untranslated = not config['SHOW_UNTRANSLATED_POSTS']
+        self.hyphenate = config['HYPHENATE']
+        self.translation_resolver = get_translation_resolver(config)
+
+
+_post_settings = {}
+
+
+def get_post_settings(config):
+    """Return the PostSettings for the site configuration config."""
+    settings = _post_settings.get(id(config))
+    # The settings keep a reference to config, so its id can't be reused
+    if settings is None or settings.config is not config:
+        settings = PostSettings(config)
+        _post_settings[id(config)] = settings
+    return settings
+
+
+class TranslatedMetadata(dict):
+
+    """Metadata of a post in a language other than the default one.
+
+    Only the values that differ from the default language are stored in
+    the dictionary itself, everything else is looked up in the default
+    language metadata.  Missing values are ''.  Deleting a key only
+    removes the translated value.
+    """
+
+    __slots__ = ('default',)
+
+    def __init__(self, own, default):
+        dict.__init__(self, own)
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default.get(key, '')
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.default
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        return (TranslatedMetadata, (dict(dict.items(self)), self.default))
+
+    def copy(self):
+        return TranslatedMetadata(dict(dict.items(self)), self.default)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def keys(self):
+        return list(set(dict.keys(self)).union(self.default))
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+
 class Post(object):
 
     """Represents a blog post or web page."""
 
+    __slots__ = ('_settings', 'compiler', 'demote_headers', 'current_time',
+                 'translated_to', '_prev_post', '_next_post', 'is_draft',
+                 'is_private', 'is_mathjax', 'is_post', 'use_in_feeds',
+                 'publish_later', 'source_path', 'post_name', 'base_path',
+                 'metadata_path', 'folder', 'messages', '_template_name',
+                 'is_two_file', 'source_index', 'meta', 'date', '_tags',
+                 '_info', '_paths', '_texts', 'translated_neighbors',
+                 # Plugins and themes may still set their own attributes
+                 '__dict__')
+
+    config = _setting('config')
+    base_url = _setting('base_url')
+    strip_indexes = _setting('strip_indexes')
+    index_file = _setting('index_file')
+    pretty_urls = _setting('pretty_urls')
+    translations = _setting('translations')
+    default_lang = _setting('default_lang')
+    skip_untranslated = _setting('skip_untranslated')
+    hyphenate = _setting('hyphenate')
+    translation_resolver = _setting('translation_resolver')
+
     def __init__(
         self,
         source_path,
@@ -80,17 +221,22 @@ class Post(object):
         use_in_feeds,
         messages,
         template_name,
-        compiler
+        compiler,
+        metadata_index=None,
+        source_index=None
     ):
         """Initialize post.
 
         The source path is the user created post file. From it we calculate
         the meta file, as well as any translations available, and
         the .html fragment file path.
+
+        If a MetadataIndex is given, metadata for unchanged sources is
+        taken from it instead of being parsed again.  If a SourceIndex is
+        given, it is used to find out which source files exist.
         """
-        self.config = config
+        self._settings = get_post_settings(config)
         self.compiler = compiler
-        self.compile_html = self.compiler.compile_html
         self.demote_headers = self.compiler.demote_headers and self.config['DEMOTE_HEADERS']
         tzinfo = self.config['__tzinfo__']
         if self.config['FUTURE_IS_NOW']:
@@ -100,53 +246,52 @@ class Post(object):
         self.translated_to = set([])
         self._prev_post = None
         self._next_post = None
-        self.base_url = self.config['BASE_URL']
+        # {lang: (prev_post, next_post)} for the languages where they are
+        # not the direct neighbors, filled by Nikola.scan_posts.
+        self.translated_neighbors = None
         self.is_draft = False
         self.is_private = False
         self.is_mathjax = False
-        self.strip_indexes = self.config['STRIP_INDEXES']
-        self.index_file = self.config['INDEX_FILE']
-        self.pretty_urls = self.config['PRETTY_URLS']
         self.source_path = source_path  # posts/blah.txt
         self.post_name = os.path.splitext(source_path)[0]  # posts/blah
         # cache[\/]posts[\/]blah.html
         self.base_path = os.path.join(self.config['CACHE_FOLDER'], self.post_name + ".html")
-        # cache/posts/blah.html
-        self._base_path = self.base_path.replace('\\', '/')
         self.metadata_path = self.post_name + ".meta"  # posts/blah.meta
         self.folder = destination
-        self.translations = self.config['TRANSLATIONS']
-        self.default_lang = self.config['DEFAULT_LANG']
         self.messages = messages
-        self.skip_untranslated = not self.config['SHOW_UNTRANSLATED_POSTS']
         self._template_name = template_name
         self.is_two_file = True
-        self.hyphenate = self.config['HYPHENATE']
-        self._reading_time = None
-        self._remaining_reading_time = None
-        self._paragraph_count = None
-        self._remaining_paragraph_count = None
+        self.source_index = source_index
+        self._info = None
+        self._paths = None
+        self._texts = None
 
-        default_metadata = get_meta(self, self.config['FILE_METADATA_REGEXP'])
+        default_metadata, lang_metadata = self._load_metadata(metadata_index)
 
-        self.meta = Functionary(lambda: None, self.default_lang)
+        self.meta = Functionary(_no_metadata, self.default_lang)
         self.meta[self.default_lang] = default_metadata
 
         # Load internationalized metadata
-        for lang in self.translations:
-            if os.path.isfile(get_translation_candidate(self.config, self.source_path, lang)):
+        if self.source_index is not None:
+            isfile = self.source_index.isfile
+        else:
+            isfile = os.path.isfile
+        for lang, candidate in self.translation_resolver.candidates(self.source_path).items():
+            if isfile(candidate):
                 self.translated_to.add(lang)
+        if lang_metadata:
+            # Translations see the default language metadata as it was read,
+            # not the values filled in below, and they all share one copy.
+            shared_metadata = dict(default_metadata)
+        for lang in self.translations:
             if lang != self.default_lang:
-                meta = defaultdict(lambda: '')
-                meta.update(default_metadata)
-                meta.update(get_meta(self, self.config['FILE_METADATA_REGEXP'], lang))
-                self.meta[lang] = meta
+                self.meta[lang] = TranslatedMetadata(lang_metadata[lang], shared_metadata)
 
         if not self.is_translation_available(self.default_lang):
             # Special case! (Issue #373)
             # Fill default_metadata with stuff from the other languages
             for lang in sorted(self.translated_to):
-                default_metadata.update(self.meta[lang])
+                default_metadata.update(self.meta[lang].items())
 
         if 'date' not in default_metadata and not use_in_feeds:
             # For stories we don't *really* need a date
@@ -196,6 +341,12 @@ class Post(object):
                 is_private = True
                 self._tags[lang].remove('private')
 
+        # Translations usually have the same tags, so they share one list
+        default_tags = self._tags.get(self.default_lang)
+        for lang, tags in self._tags.items():
+            if tags == default_tags:
+                self._tags[lang] = default_tags
+
         # While draft comes from the tags, it's not really a tag
         self.is_draft = is_draft
         self.is_private = is_private
@@ -206,9 +357,44 @@ class Post(object):
         # If mathjax is a tag, then enable mathjax rendering support
         self.is_mathjax = 'mathjax' in self.tags
 
+    @property
+    def compile_html(self):
+        return self.compiler.compile_html
+
+    @property
+    def _base_path(self):
+        # cache/posts/blah.html
+        return self.base_path.replace('\\', '/')
+
     def __repr__(self):
         return '<Post: {0}>'.format(self.source_path)
 
+    def _load_metadata(self, metadata_index=None):
+        """Return the default language metadata and the metadata of other languages.
+
+        The second value is a dict of {lang: metadata}.  If metadata_index
+        is given and knows about this post in its current state, no source
+        is read.
+        """
+        if metadata_index is not None:
+            signature = metadata_index.signature(self)
+            entry = metadata_index.get(self.source_path, signature)
+            if entry is None:
+                entry = read_metadata(self)
+                metadata_index.set(self.source_path, signature, entry)
+        else:
+            entry = read_metadata(self)
+        self.is_two_file = entry['is_two_file']
+        default_metadata = defaultdict(unicode_str)
+        default_metadata.update(entry['meta'][self.default_lang])
+        metadata = {}
+        for lang, values in entry['meta'].items():
+            if lang != self.default_lang:
+                # Only keep what differs from the default language
+                metadata[lang] = dict((k, v) for k, v in values.items()
+                                      if k not in default_metadata or default_metadata[k] != v)
+        return default_metadata, metadata
+
     def _has_pretty_url(self, lang):
         if self.pretty_urls and \
                 self.meta[lang].get('pretty_url', '') != 'False' and \
@@ -235,9 +421,14 @@ class Post(object):
         else:
             return []
 
+    def _neighbors(self, lang):
+        return self.translated_neighbors.get(lang, (self._prev_post, self._next_post))
+
     @property
     def prev_post(self):
         lang = nikola.utils.LocaleBorg().current_lang
+        if self.skip_untranslated and self.translated_neighbors is not None:
+            return self._neighbors(lang)[0]
         rv = self._prev_post
         while self.skip_untranslated:
             if rv is None:
@@ -250,10 +441,13 @@ class Post(object):
     @prev_post.setter  # NOQA
     def prev_post(self, v):
         self._prev_post = v
+        self.translated_neighbors = None
 
     @property
     def next_post(self):
         lang = nikola.utils.LocaleBorg().current_lang
+        if self.skip_untranslated and self.translated_neighbors is not None:
+            return self._neighbors(lang)[1]
         rv = self._next_post
         while self.skip_untranslated:
             if rv is None:
@@ -266,6 +460,7 @@ class Post(object):
     @next_post.setter  # NOQA
     def next_post(self, v):
         self._next_post = v
+        self.translated_neighbors = None
 
     @property
     def template_name(self):
@@ -316,7 +511,7 @@ class Post(object):
         if self.default_lang in self.translated_to:
             deps.append(self.base_path)
         if lang != self.default_lang:
-            deps += [get_translation_candidate(self.config, self.base_path, lang)]
+            deps += [self.translation_resolver.candidate(self.base_path, lang)]
         return deps
 
     def compile(self, lang):
@@ -339,8 +534,12 @@ class Post(object):
             self.translated_source_path(lang),
             dest,
             self.is_two_file),
+        if self.hyphenate == 'compile':
+            _hyphenate_fragment(dest, lang)
         if self.meta('password'):
             wrap_encrypt(dest, self.meta('password'))
+        if self.is_translation_available(lang):
+            self.fragment_info(lang, save=True)
         if self.publish_later:
             LOGGER.notice('{0} is scheduled to be published in the future ({1})'.format(
                 self.source_path, self.date))
@@ -357,17 +556,21 @@ class Post(object):
 
     def fragment_deps(self, lang):
         """Return a list of dependencies to build this post's fragment."""
+        if self.source_index is not None:
+            exists = self.source_index.exists
+        else:
+            exists = os.path.exists
         deps = []
         if self.default_lang in self.translated_to:
             deps.append(self.source_path)
-        if os.path.isfile(self.metadata_path):
+        if exists(self.metadata_path):
             deps.append(self.metadata_path)
         deps.extend(self.extra_deps())
         lang_deps = []
         if lang != self.default_lang:
-            lang_deps = [get_translation_candidate(self.config, d, lang) for d in deps]
+            lang_deps = [self.translation_resolver.candidate(d, lang) for d in deps]
             deps += lang_deps
-        return [d for d in deps if os.path.exists(d)]
+        return [d for d in deps if exists(d)]
 
     def is_translation_available(self, lang):
         """Return true if the translation actually exists."""
@@ -379,15 +582,15 @@ class Post(object):
             if lang == self.default_lang:
                 return self.source_path
             else:
-                return get_translation_candidate(self.config, self.source_path, lang)
+                return self.translation_resolver.candidate(self.source_path, lang)
         elif lang != self.default_lang:
             return self.source_path
         else:
-            return get_translation_candidate(self.config, self.source_path, sorted(self.translated_to)[0])
+            return self.translation_resolver.candidate(self.source_path, sorted(self.translated_to)[0])
 
     def translated_base_path(self, lang):
         """Return path to the translation's base_path file."""
-        return get_translation_candidate(self.config, self.base_path, lang)
+        return self.translation_resolver.candidate(self.base_path, lang)
 
     def _translated_file_path(self, lang):
         """Return path to the translation's file, or to the original."""
@@ -395,11 +598,11 @@ class Post(object):
             if lang == self.default_lang:
                 return self.base_path
             else:
-                return get_translation_candidate(self.config, self.base_path, lang)
+                return self.translation_resolver.candidate(self.base_path, lang)
         elif lang != self.default_lang:
             return self.base_path
         else:
-            return get_translation_candidate(self.config, self.base_path, sorted(self.translated_to)[0])
+            return self.translation_resolver.candidate(self.base_path, sorted(self.translated_to)[0])
 
     def text(self, lang=None, teaser_only=False, strip_html=False, show_read_more_link=True):
         """Read the post file for that language and return its contents.
@@ -411,13 +614,49 @@ class Post(object):
 
         All links in the returned HTML will be relative.
         The HTML returned is a bare fragment, not a full document.
+
+        The result is kept for each combination of arguments, until the
+        compiled file for that language changes.
         """
 
         if lang is None:
             lang = nikola.utils.LocaleBorg().current_lang
         file_name = self._translated_file_path(lang)
-        with codecs.open(file_name, "r", "utf8") as post_file:
-            data = post_file.read().strip()
+        signature = _file_signature(file_name)
+        key = (lang, teaser_only, strip_html, show_read_more_link)
+        if self._texts is None:
+            self._texts = {}
+        cached = self._texts.get(key)
+        if cached is not None and cached[0] == signature:
+            text_cache_stats.hits += 1
+            return cached[1]
+        text_cache_stats.misses += 1
+        teaser = None
+        if teaser_only:
+            info = self._load_fragment_info(lang, signature)
+            if info is not None and 'teaser' in info:
+                teaser = info['teaser']
+                if teaser is None:  # No teaser marker, the teaser is the whole post
+                    data = self.text(lang, False, strip_html, show_read_more_link)
+                    self._texts[key] = (signature, data)
+                    return data
+                if teaser['html'] is None:  # Needs the whole post
+                    teaser = None
+        data = self._text(file_name, lang, teaser_only, strip_html, show_read_more_link, teaser)
+        self._texts[key] = (signature, data)
+        return data
+
+    def _text(self, file_name, lang, teaser_only, strip_html, show_read_more_link, teaser=None):
+        """Compute text() for the compiled file file_name.
+
+        If teaser is given, it is the teaser recorded by compile(), and it
+        is used instead of the file.
+        """
+        if teaser is not None:
+            data = teaser['html']
+        else:
+            with codecs.open(file_name, "r", "utf8") as post_file:
+                data = post_file.read().strip()
         try:
             document = lxml.html.fragment_fromstring(data, "body")
         except lxml.etree.ParserError as e:
@@ -429,20 +668,57 @@ class Post(object):
         base_url = self.permalink(lang=lang)
         document.make_links_absolute(base_url)
 
-        if self.hyphenate:
+        if self.hyphenate and self.hyphenate != 'compile':
             hyphenate(document, lang)
 
-        data = lxml.html.tostring(document, encoding='unicode')
-        # data here is a full HTML doc, including HTML and BODY tags
-        # which is not ideal (Issue #464)
-        try:
-            body = document.body
-            data = (body.text or '') + ''.join(
-                [lxml.html.tostring(child, encoding='unicode')
-                    for child in body.iterchildren()])
-        except IndexError:  # No body there, it happens sometimes
-            pass
-
+        # The teaser, header demotion and strip_html all work on the
+        # tree parsed above.  Fragments that would not parse back into
+        # the same tree go through _text_from_html instead.
+        root = None
+        if teaser is not None:
+            if not strip_html and show_read_more_link:
+                _append_html(document, self._read_more_link(lang, teaser['read_more']))
+            root = _fragment_root(document)
+        elif teaser_only:
+            marker = _teaser_marker(document)
+            if marker is not None:
+                if marker.getparent() is not document or not _reparses_as_is(document, marker):
+                    return self._text_from_html(_fragment_html(document), lang, teaser_only,
+                                                strip_html, show_read_more_link)
+                del document[document.index(marker):]
+                if not strip_html and show_read_more_link:
+                    _append_html(document, self._read_more_link(lang, _teaser_text(marker)))
+                root = _fragment_root(document)
+
+        if root is None:
+            if not strip_html and not self.demote_headers:
+                return _fragment_html(document)
+            if not _reparses_as_is(document):
+                return self._text_from_html(_fragment_html(document), lang, False,
+                                            strip_html, show_read_more_link)
+            root = _fragment_root(document)
+
+        if strip_html:
+            return root.text_content().strip()  # No whitespace wanted.
+        if self.demote_headers:
+            demote_headers(root, self.demote_headers)
+        return lxml.html.tostring(root, encoding='unicode')
+
+    def _read_more_link(self, lang, custom_text=None):
+        """Return the HTML of the "Read more" link, with custom_text if given."""
+        if custom_text:
+            return '<p class="more"><a href="{0}">{1}</a></p>'.format(
+                self.permalink(lang), custom_text)
+        return self._format_read_more_link(lang)
+
+    def _format_read_more_link(self, lang):
+        return self.config['READ_MORE_LINK'](lang).format(
+            link=self.permalink(lang),
+            read_more=self.messages[lang]["Read more"],
+            **self.text_stats(lang))
+
+    def _text_from_html(self, data, lang, teaser_only, strip_html, show_read_more_link):
+        """Finish text() for data, by working on the serialized HTML."""
         if teaser_only:
             teaser = TEASER_REGEXP.split(data)[0]
             if teaser != data:
@@ -452,16 +728,14 @@ class Post(object):
                             self.permalink(lang),
                             TEASER_REGEXP.search(data).groups()[-1])
                     else:
-                        teaser += self.config['READ_MORE_LINK'](lang).format(
-                            link=self.permalink(lang),
-                            read_more=self.messages[lang]["Read more"],
-                            reading_time=self.reading_time,
-                            remaining_reading_time=self.remaining_reading_time,
-                            paragraph_count=self.paragraph_count,
-                            remaining_paragraph_count=self.remaining_paragraph_count)
+                        teaser += self._format_read_more_link(lang)
                 # This closes all open tags and sanitizes the broken HTML
-                document = lxml.html.fromstring(teaser)
-                data = lxml.html.tostring(document, encoding='unicode')
+                try:
+                    document = lxml.html.fromstring(teaser)
+                    data = lxml.html.tostring(document, encoding='unicode')
+                except lxml.etree.ParserError:
+                    # The teaser marker is at the start of the post
+                    data = ""
 
         if data and strip_html:
             try:
@@ -485,61 +759,111 @@ class Post(object):
     @property
     def reading_time(self):
         """Reading time based on length of text."""
-        if self._reading_time is None:
-            text = self.text(strip_html=True)
-            words_per_minute = 220
-            words = len(text.split())
-            self._reading_time = int(ceil(words / words_per_minute)) or 1
-        return self._reading_time
+        return self.text_stats()['reading_time']
 
     @property
     def remaining_reading_time(self):
         """Remaining reading time based on length of text (does not include teaser)."""
-        if self._remaining_reading_time is None:
-            text = self.text(teaser_only=True, strip_html=True)
-            words_per_minute = 220
-            words = len(text.split())
-            self._remaining_reading_time = self.reading_time - int(ceil(words / words_per_minute)) or 1
-        return self._remaining_reading_time
+        return self.text_stats()['remaining_reading_time']
 
     @property
     def paragraph_count(self):
         """Return the paragraph count for this post."""
-        if self._paragraph_count is None:
-            # duplicated with Post.text()
-            lang = nikola.utils.LocaleBorg().current_lang
-            file_name = self._translated_file_path(lang)
-            with codecs.open(file_name, "r", "utf8") as post_file:
-                data = post_file.read().strip()
-            try:
-                document = lxml.html.fragment_fromstring(data, "body")
-            except lxml.etree.ParserError as e:
-                # if we don't catch this, it breaks later (Issue #374)
-                if str(e) == "Document is empty":
-                    return ""
-                # let other errors raise
-                raise(e)
-
-            # output is a float, for no real reason at all
-            self._paragraph_count = int(document.xpath('count(//p)'))
-        return self._paragraph_count
+        return self.text_stats()['paragraph_count']
 
     @property
     def remaining_paragraph_count(self):
         """Return the remaining paragraph count for this post (does not include teaser)."""
-        if self._remaining_paragraph_count is None:
-            try:
-                # Just asking self.text() is easier here.
-                document = lxml.html.fragment_fromstring(self.text(teaser_only=True, show_read_more_link=False), "body")
-            except lxml.etree.ParserError as e:
-                # if we don't catch this, it breaks later (Issue #374)
-                if str(e) == "Document is empty":
-                    return ""
-                # let other errors raise
-                raise(e)
-
-            self._remaining_paragraph_count = self.paragraph_count - int(document.xpath('count(//p)'))
-        return self._remaining_paragraph_count
+        return self.text_stats()['remaining_paragraph_count']
+
+    def text_stats(self, lang=None):
+        """Return the reading times and paragraph counts of the post in lang."""
+        return self.fragment_info(lang)['stats']
+
+    def fragment_info(self, lang=None, save=False):
+        """Return what is known about the compiled post in lang.
+
+        This is a dict with the post's 'stats' (see text_stats) and its
+        'teaser': None if there is no teaser marker, else a dict with the
+        'html' before the marker and the 'read_more' text given in it.
+        The 'html' is None if the teaser can only be cut from the whole
+        post.
+
+        compile() saves it with save=True in a .info file next to the
+        compiled post.  The file is only used while the compiled post has
+        the mtime and size recorded in it; fields missing from it are
+        computed.
+        """
+        if lang is None:
+            lang = nikola.utils.LocaleBorg().current_lang
+        file_name = self._translated_file_path(lang)
+        signature = _file_signature(file_name)
+        calc = {
+            'stats': lambda: self._calc_text_stats(lang),
+            'teaser': lambda: _calc_teaser(file_name),
+        }
+        if self._info is None:
+            self._info = {}
+        info = None
+        if not save:
+            info = self._load_fragment_info(lang, signature)
+        if info is None:
+            info = {'signature': signature}
+        missing = [field for field in calc if field not in info]
+        if missing:
+            for field in missing:
+                info[field] = calc[field]()
+            if save:
+                with codecs.open(self.fragment_info_path(lang), 'wb+', 'utf8') as outf:
+                    json.dump(info, outf, sort_keys=True)
+        self._info[lang] = info
+        return info
+
+    def fragment_info_path(self, lang):
+        """Return the path of the .info file for lang."""
+        return self._translated_file_path(lang) + '.info'
+
+    def _load_fragment_info(self, lang, signature):
+        """Return the fragment info for lang if it matches signature, else None."""
+        if self._info is None:
+            self._info = {}
+        info = self._info.get(lang)
+        if info is not None and info['signature'] == signature:
+            return info
+        info_path = self.fragment_info_path(lang)
+        if not os.path.isfile(info_path):
+            return None
+        try:
+            with codecs.open(info_path, 'rb', 'utf8') as inf:
+                info = json.load(inf)
+        except ValueError:
+            return None
+        if info.get('signature') != signature:
+            return None
+        self._info[lang] = info
+        return info
+
+    def _calc_text_stats(self, lang):
+        words_per_minute = 220
+        words = len(self.text(lang, strip_html=True).split())
+        reading_time = int(ceil(words / words_per_minute)) or 1
+        words = len(self.text(lang, teaser_only=True, strip_html=True).split())
+        remaining_reading_time = reading_time - int(ceil(words / words_per_minute)) or 1
+
+        paragraph_count = remaining_paragraph_count = ""
+        document = _parse_fragment(self.text(lang, show_read_more_link=False))
+        if document is not None:
+            # output is a float, for no real reason at all
+            paragraph_count = int(document.xpath('count(//p)'))
+            document = _parse_fragment(self.text(lang, teaser_only=True, show_read_more_link=False))
+            if document is not None:
+                remaining_paragraph_count = paragraph_count - int(document.xpath('count(//p)'))
+        return {
+            'reading_time': reading_time,
+            'remaining_reading_time': remaining_reading_time,
+            'paragraph_count': paragraph_count,
+            'remaining_paragraph_count': remaining_paragraph_count,
+        }
 
     def source_link(self, lang=None):
         """Return absolute link to the post's source."""
@@ -548,6 +872,23 @@ class Post(object):
             extension=self.source_ext(),
             sep='/')
 
+    def _cached_path(self, key, lang):
+        """Return the full cache key and the path cached under it, or None.
+
+        The metadata used to build the paths is part of the key, so
+        changing it gives new paths.
+        """
+        meta = self.meta[lang]
+        key += (meta['slug'], meta.get('pretty_url', ''))
+        if self._paths is None:
+            self._paths = {}
+        path = self._paths.get(key)
+        if path is None:
+            path_cache_stats.misses += 1
+        else:
+            path_cache_stats.hits += 1
+        return key, path
+
     def destination_path(self, lang=None, extension='.html', sep=os.sep):
         """Destination path for this post, relative to output/.
 
@@ -556,6 +897,9 @@ class Post(object):
         """
         if lang is None:
             lang = nikola.utils.LocaleBorg().current_lang
+        key, path = self._cached_path(('destination', lang, extension, sep), lang)
+        if path is not None:
+            return path
         if self._has_pretty_url(lang):
             path = os.path.join(self.translations[lang],
                                 self.folder, self.meta[lang]['slug'], 'index' + extension)
@@ -564,11 +908,15 @@ class Post(object):
                                 self.folder, self.meta[lang]['slug'] + extension)
         if sep != os.sep:
             path = path.replace(os.sep, sep)
+        self._paths[key] = path
         return path
 
     def permalink(self, lang=None, absolute=False, extension='.html'):
         if lang is None:
             lang = nikola.utils.LocaleBorg().current_lang
+        key, link = self._cached_path(('permalink', lang, absolute, extension), lang)
+        if link is not None:
+            return link
 
         pieces = self.translations[lang].split(os.sep)
         pieces += self.folder.split(os.sep)
@@ -582,22 +930,192 @@ class Post(object):
             link = urljoin(self.base_url, link[1:])
         index_len = len(self.index_file)
         if self.strip_indexes and link[-(1 + index_len):] == '/' + self.index_file:
-            return link[:-index_len]
-        else:
-            return link
+            link = link[:-index_len]
+        self._paths[key] = link
+        return link
 
     def source_ext(self):
         return os.path.splitext(self.source_path)[1]
 
+
+class MetadataIndex(object):
+
+    """A persistent index of the metadata found in post sources.
+
+    Entries are keyed by source path and store the size and modification
+    time of every file the metadata could have been read from (the source,
+    its .meta file, and their translations).  The whole index is discarded
+    when a setting that changes how metadata is found or parsed changes.
+
+    If path is None, the index is only kept in memory.  If a SourceIndex
+    is given, files it does not know about are not stat()ed.
+    """
+
+    version = 1
+
+    def __init__(self, path, config, source_index=None):
+        self.path = path
+        self.config = config
+        self.source_index = source_index
+        self.digest = self._calc_digest()
+        self.entries = {}
+        self.seen = set([])
+        self.changed = False
+        self.load()
+
+    def _calc_digest(self):
+        """Digest of the settings that affect metadata parsing."""
+        data = json.dumps({
+            'version': self.version,
+            'DEFAULT_LANG': self.config['DEFAULT_LANG'],
+            'TRANSLATIONS': self.config['TRANSLATIONS'],
+            'TRANSLATIONS_PATTERN': self.config['TRANSLATIONS_PATTERN'],
+            'FILE_METADATA_REGEXP': self.config['FILE_METADATA_REGEXP'],
+            'post_pages': self.config['post_pages'],
+        }, cls=CustomEncoder, sort_keys=True)
+        return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+    def load(self):
+        """Load the index from disk, ignoring it if it is stale or broken."""
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with codecs.open(self.path, 'rb', 'utf8') as inf:
+                data = json.load(inf)
+        except ValueError:
+            LOGGER.warning('Ignoring broken metadata index {0}'.format(self.path))
+            return
+        if data.get('digest') == self.digest:
+            self.entries = data['entries']
+
+    def save(self):
+        """Write the index to disk, dropping posts that were not seen."""
+        for source_path in set(self.entries) - self.seen:
+            del self.entries[source_path]
+            self.changed = True
+        if self.path is None or not self.changed:
+            return
+        nikola.utils.makedirs(os.path.dirname(self.path))
+        data = json.dumps({'digest': self.digest, 'entries': self.entries},
+                          sort_keys=True)
+        tmp_path = self.path + '.tmp'
+        with codecs.open(tmp_path, 'wb+', 'utf8') as outf:
+            outf.write(data)
+        if sys.platform == 'win32' and os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(tmp_path, self.path)
+        self.changed = False
+
+    def signature(self, post):
+        """Return [path, mtime, size] for all files post metadata may come from."""
+        paths = []
+        resolver = get_translation_resolver(self.config)
+        for candidates in resolver.batch([post.source_path, post.metadata_path]):
+            for lang in sorted(candidates):
+                if candidates[lang] not in paths:
+                    paths.append(candidates[lang])
+        signature = []
+        for path in paths:
+            if self.source_index is not None and not self.source_index.isfile(path):
+                signature.append([path, None, None])
+                continue
+            try:
+                stat = os.stat(path)
+                signature.append([path, stat.st_mtime, stat.st_size])
+            except OSError:
+                signature.append([path, None, None])
+        return signature
+
+    def update(self, source_paths, workers):
+        """Read the metadata of new or modified sources in worker processes.
+
+        Falls back to reading them later, one by one, if the processes
+        cannot be started.
+        """
+        todo = []
+        signatures = {}
+        for source_path in source_paths:
+            signature = self.signature(_MetadataSource(source_path, self.config))
+            if self.get(source_path, signature) is None:
+                todo.append(source_path)
+                signatures[source_path] = signature
+        if len(todo) < 2:
+            return
+        config = dict((k, self.config[k]) for k in (
+            'DEFAULT_LANG', 'TRANSLATIONS', 'TRANSLATIONS_PATTERN',
+            'FILE_METADATA_REGEXP'))
+        workers = min(workers, len(todo))
+        try:
+            pool = multiprocessing.Pool(workers, _init_metadata_worker, (config,))
+        except (OSError, ImportError) as e:
+            LOGGER.warning('Cannot start metadata workers, scanning serially ({0})'.format(e))
+            return
+        try:
+            results = pool.map(_read_metadata_worker, todo,
+                               max(1, len(todo) // (workers * 4)))
+        finally:
+            # All results are in or the scan failed, either way the
+            # workers are done.
+            pool.terminate()
+            pool.join()
+        for source_path, entry in results:
+            self.set(source_path, signatures[source_path], entry)
+
+    def get(self, source_path, signature):
+        """Return the entry for source_path, or None if it is missing or stale."""
+        self.seen.add(source_path)
+        entry = self.entries.get(source_path)
+        if entry is not None and entry['signature'] == signature:
+            return entry
+        return None
+
+    def set(self, source_path, signature, entry):
+        """Store the entry for source_path."""
+        self.seen.add(source_path)
+        entry['signature'] = signature
+        self.entries[source_path] = entry
+        self.changed = True
+
+
+class _MetadataSource(object):
+
+    """The parts of a Post that read_metadata needs."""
+
+    def __init__(self, source_path, config):
+        self.source_path = source_path
+        self.metadata_path = os.path.splitext(source_path)[0] + ".meta"
+        self.config = config
+        self.is_two_file = True
+
+
+_worker_config = None
+
+
+def _init_metadata_worker(config):
+    global _worker_config
+    _worker_config = config
+
+
+def _read_metadata_worker(source_path):
+    return source_path, read_metadata(_MetadataSource(source_path, _worker_config))
+
 # Code that fetches metadata from different places
 
 
+_re_meta = re.compile(r'^\.\. (.*?): (.*)')
+_re_newstyle_meta = re.compile(r'\.\. .*?: .*')
+_re_md_title = re.compile(r'^{0}([^{0}].*)'.format(re.escape('#')))
+# Assuming rst titles are going to be at least 4 chars long
+# otherwise this detects things like ''' wich breaks other markups.
+_re_rst_title = re.compile(r'^([{0}]{{4,}})'.format(re.escape(string.punctuation)))
+
+
 def re_meta(line, match=None):
     """re.compile for meta"""
     if match:
         reStr = re.compile('^\.\. {0}: (.*)'.format(re.escape(match)))
     else:
-        reStr = re.compile('^\.\. (.*?): (.*)')
+        reStr = _re_meta
     result = reStr.findall(line.strip())
     if match and result:
         return (match, result[0])
@@ -634,8 +1152,8 @@ def get_metadata_from_file(source_path, config=None, lang=None):
         elif lang:
             source_path += '.' + lang
         with codecs.open(source_path, "r", "utf8") as meta_file:
-            meta_data = [x.strip() for x in meta_file.readlines()]
-        return _get_metadata_from_file(meta_data)
+            # Lines are read lazily, so reading stops at the end of the header
+            return _get_metadata_from_file(x.strip() for x in meta_file)
     except (UnicodeDecodeError, UnicodeEncodeError):
         raise ValueError('Error reading {0}: Nikola only supports UTF-8 files'.format(source_path))
     except Exception:  # The file may not exist, for multilingual sites
@@ -659,15 +1177,15 @@ def _get_metadata_from_file(meta_data):
     >>> 'title' in g(["",".. title: FooBar"])  # for #520
     True
 
+    >>> 'title' in g(iter(["", ".. title: FooBar", "", "Lots of text"]))
+    True
+
     """
     meta = {}
+    previous = None
 
-    re_md_title = re.compile(r'^{0}([^{0}].*)'.format(re.escape('#')))
-    # Assuming rst titles are going to be at least 4 chars long
-    # otherwise this detects things like ''' wich breaks other markups.
-    re_rst_title = re.compile(r'^([{0}]{{4,}})'.format(re.escape(
-        string.punctuation)))
-
+    # meta_data may be a generator over a file, so only the current and
+    # previous lines are available.
     for i, line in enumerate(meta_data):
         # txt2tags requires an empty line at the beginning
         # and since we are here because it's a 1-file post
@@ -675,20 +1193,20 @@ def _get_metadata_from_file(meta_data):
         # first lines.
         if not line and i > 0:
             break
+        match = _re_meta.match(line)
         if 'title' not in meta:
-            match = re_meta(line, 'title')
-            if match[0]:
-                meta['title'] = match[1]
-        if 'title' not in meta:
-            if re_rst_title.findall(line) and i > 0:
-                meta['title'] = meta_data[i - 1].strip()
-        if 'title' not in meta:
-            if re_md_title.findall(line):
-                meta['title'] = re_md_title.findall(line)[0]
+            if match and match.group(1) == 'title':
+                meta['title'] = match.group(2)
+            elif i > 0 and _re_rst_title.match(line):
+                meta['title'] = previous.strip()
+            else:
+                md_match = _re_md_title.match(line)
+                if md_match:
+                    meta['title'] = md_match.group(1)
 
-        match = re_meta(line)
-        if match[0]:
-            meta[match[0]] = match[1]
+        if match:
+            meta[match.group(1)] = match.group(2)
+        previous = line
 
     return meta
 
@@ -705,17 +1223,12 @@ def get_metadata_from_meta_file(path, config=None, lang=None):
             meta_data = meta_file.readlines()
 
         # Detect new-style metadata.
-        newstyleregexp = re.compile(r'\.\. .*?: .*')
-        newstylemeta = False
-        for l in meta_data:
-            if l.strip():
-                if re.match(newstyleregexp, l):
-                    newstylemeta = True
+        newstylemeta = any(_re_newstyle_meta.match(l) for l in meta_data)
 
         if newstylemeta:
             # New-style metadata is basically the same as reading metadata from
-            # a 1-file post.
-            return get_metadata_from_file(path, config, lang)
+            # a 1-file post, and it's parsed from the lines we already have.
+            return _get_metadata_from_file([x.strip() for x in meta_data])
         else:
             while len(meta_data) < 7:
                 meta_data.append("")
@@ -793,35 +1306,200 @@ def get_meta(post, file_metadata_regexp=None, lang=None):
     return meta
 
 
+def read_metadata(post):
+    """Read the metadata of a post in all languages.
+
+    Only the source_path, metadata_path and config attributes of post are
+    used.  Returns a dict with the metadata ({lang: metadata}) in 'meta'
+    and whether the post uses a .meta file in 'is_two_file'.
+    """
+    config = post.config
+    file_metadata_regexp = config['FILE_METADATA_REGEXP']
+    post.is_two_file = True
+    meta = {config['DEFAULT_LANG']: dict(get_meta(post, file_metadata_regexp))}
+    for lang in config['TRANSLATIONS']:
+        if lang != config['DEFAULT_LANG']:
+            meta[lang] = dict(get_meta(post, file_metadata_regexp, lang))
+    return {'is_two_file': post.is_two_file, 'meta': meta}
+
+
+def _file_signature(path):
+    """Return [mtime, size] of path."""
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def _parse_fragment(data):
+    """Parse data with fragment_fromstring, or return None if it is empty."""
+    try:
+        return lxml.html.fragment_fromstring(data, "body")
+    except lxml.etree.ParserError as e:
+        # if we don't catch this, it breaks later (Issue #374)
+        if str(e) == "Document is empty":
+            return None
+        # let other errors raise
+        raise(e)
+
+
+# Elements the HTML parser moves to <head> when they start a document
+_head_tags = frozenset(['base', 'link', 'meta', 'noscript', 'script', 'style', 'title'])
+
+
+def _fragment_html(document):
+    """Serialize the contents of a fragment parsed by text()."""
+    data = lxml.html.tostring(document, encoding='unicode')
+    # data here is a full HTML doc, including HTML and BODY tags
+    # which is not ideal (Issue #464)
+    try:
+        body = document.body
+        data = (body.text or '') + ''.join(
+            [lxml.html.tostring(child, encoding='unicode')
+                for child in body.iterchildren()])
+    except IndexError:  # No body there, it happens sometimes
+        pass
+    return data
+
+
+def _comment_html(comment):
+    return '<!--{0}-->'.format(comment.text)
+
+
+def _teaser_text(marker):
+    """Return the custom "Read more" text of a teaser marker, or None."""
+    return TEASER_REGEXP.match(_comment_html(marker)).groups()[-1]
+
+
+def _calc_teaser(file_name):
+    """Find the teaser of a compiled post, for Post.fragment_info."""
+    with codecs.open(file_name, "r", "utf8") as post_file:
+        data = post_file.read().strip()
+    document = _parse_fragment(data)
+    marker = None if document is None else _teaser_marker(document)
+    if marker is None:
+        return None
+    teaser = {'html': None, 'read_more': _teaser_text(marker)}
+    if marker.getparent() is document and _reparses_as_is(document, marker):
+        teaser['html'] = ''.join(
+            [lxml.html.tostring(child, encoding='unicode')
+                for child in document[:document.index(marker)]])
+    return teaser
+
+
+def _teaser_marker(document):
+    """Return the first teaser marker comment in document, or None."""
+    for comment in document.iter(lxml.etree.Comment):
+        if TEASER_REGEXP.match(_comment_html(comment)):
+            return comment
+    return None
+
+
+def _reparses_as_is(document, end=None):
+    """Tell if the HTML of document, up to end, parses back into the same tree.
+
+    lxml.html.fromstring keeps text at the start of a fragment as it is
+    serialized (unescaped), drops leading comments, and returns a whole
+    document for fragments that start with <head> elements.
+    """
+    if document.text or not len(document) or document[0] is end:
+        return False
+    first = document[0]
+    return isinstance(first, lxml.html.HtmlElement) and first.tag not in _head_tags
+
+
+def _append_html(document, html):
+    """Add the elements in html at the end of document."""
+    if not html:
+        return
+    for item in lxml.html.fragments_fromstring(html):
+        if not isinstance(item, lxml.etree._Element):
+            if len(document):
+                document[-1].tail = (document[-1].tail or '') + item
+            else:
+                document.text = (document.text or '') + item
+        else:
+            document.append(item)
+
+
+def _fragment_root(document):
+    """Return what lxml.html.fromstring gives for the HTML of document."""
+    if len(document) == 1 and not (document[0].tail or '').strip():
+        return document[0]
+    # Like lxml.html, use a <div> or <span> as container
+    if any(el.tag in lxml.html.defs.block_tags for el in document.iter(lxml.etree.Element)):
+        document.tag = 'div'
+    else:
+        document.tag = 'span'
+    return document
+
+
+# pyphen.Pyphen instances by language, see get_hyphenator
+_hyphenators = {}
+hyphenation_cache_stats = CacheStats('hyphenate')
+# Hyphenated words by (lang, word)
+_hyphenated_words = LRUCache(50000, hyphenation_cache_stats)
+
+
+def get_hyphenator(lang):
+    """Return the pyphen.Pyphen for lang, creating it only once."""
+    hyphenator = _hyphenators.get(lang)
+    if hyphenator is None:
+        hyphenator = _hyphenators[lang] = pyphen.Pyphen(lang=lang)
+    return hyphenator
+
+
 def hyphenate(dom, lang):
     if pyphen is not None:
-        hyphenator = pyphen.Pyphen(lang=lang)
+        hyphenator = get_hyphenator(lang)
         for tag in ('p', 'li', 'span'):
             for node in dom.xpath("//%s[not(parent::pre)]" % tag):
-                insert_hyphens(node, hyphenator)
+                insert_hyphens(node, hyphenator, lang)
     return dom
 
 
-def insert_hyphens(node, hyphenator):
-    textattrs = ('text', 'tail')
-    if isinstance(node, lxml.etree._Entity):
-        # HTML entities have no .text
-        textattrs = ('tail',)
-    for attr in textattrs:
-        text = getattr(node, attr)
-        if not text:
-            continue
-        new_data = ' '.join([hyphenator.inserted(w, hyphen='\u00AD')
-                             for w in text.split(' ')])
-        # Spaces are trimmed, we have to add them manually back
-        if text[0].isspace():
-            new_data = ' ' + new_data
-        if text[-1].isspace():
-            new_data += ' '
-        setattr(node, attr, new_data)
-
-    for child in node.iterchildren():
-        insert_hyphens(child, hyphenator)
+def _hyphenate_fragment(path, lang):
+    """Hyphenate the compiled post in path, for HYPHENATE = 'compile'."""
+    with codecs.open(path, "r", "utf8") as inf:
+        document = _parse_fragment(inf.read().strip())
+    if document is None:
+        return
+    hyphenate(document, lang)
+    with codecs.open(path, "wb+", "utf8") as outf:
+        outf.write(_fragment_html(document))
+
+
+def _hyphenate_word(word, hyphenator, lang):
+    """Hyphenate word, remembering the result if lang is given."""
+    if lang is None:
+        return hyphenator.inserted(word, hyphen='\u00AD')
+    key = (lang, word)
+    result = _hyphenated_words.get(key)
+    if result is None:
+        result = hyphenator.inserted(word, hyphen='\u00AD')
+        _hyphenated_words[key] = result
+    return result
+
+
+def insert_hyphens(node, hyphenator, lang=None):
+    # node.iter() walks node and its descendants in document order
+    for item in node.iter():
+        textattrs = ('text', 'tail')
+        if isinstance(item, (lxml.etree._Entity, lxml.etree._Comment,
+                             lxml.etree._ProcessingInstruction)):
+            # HTML entities have no .text, and comments (like the teaser
+            # marker) are not shown
+            textattrs = ('tail',)
+        for attr in textattrs:
+            text = getattr(item, attr)
+            if not text:
+                continue
+            new_data = ' '.join([_hyphenate_word(w, hyphenator, lang)
+                                 for w in text.split(' ')])
+            # Spaces are trimmed, we have to add them manually back
+            if text[0].isspace():
+                new_data = ' ' + new_data
+            if text[-1].isspace():
+                new_data += ' '
+            setattr(item, attr, new_data)
 
 
 CRYPT = string.Template("""\
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2014 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Run doit tasks in processes forked after the tasks are loaded.
+
+doit's MRunner may start its workers with the platform's default start
+method.  With "spawn" the runner, and with it every task, has to be
+pickled, which fails for Nikola: task actions are bound methods of the
+site, its posts and its plugins.  ForkRunner always forks, after the
+posts are scanned and the tasks are generated, so every worker inherits
+the site as it is.  Only task names and picklable task data go through
+the queues, and task results are processed in the main process, as with
+MRunner.  Workers send the cache counters (see nikola.utils.CacheStats)
+of each task with its result, and the main process adds them to its own.
+"""
+
+from __future__ import unicode_literals
+import multiprocessing
+import os
+
+from doit.runner import MRunner
+
+from .utils import CacheStats
+
+try:
+    _fork_context = multiprocessing.get_context('fork')
+except AttributeError:  # Python 2 always forks, where it can
+    _fork_context = multiprocessing if hasattr(os, 'fork') else None
+except ValueError:  # No fork here (Windows)
+    _fork_context = None
+
+__all__ = ['ForkRunner']
+
+
+class ForkRunner(MRunner):
+
+    """A doit runner whose workers are forked from the main process."""
+
+    if _fork_context is not None:
+        Queue = staticmethod(_fork_context.Queue)
+        Child = staticmethod(_fork_context.Process)
+
+    def __init__(self, *args, **kwargs):
+        super(ForkRunner, self).__init__(*args, **kwargs)
+        self.processes = []
+
+    @staticmethod
+    def available():
+        """Tell if processes can be forked here."""
+        return _fork_context is not None and MRunner.available()
+
+    def _run_start_processes(self, job_q, result_q):
+        self.processes = super(ForkRunner, self)._run_start_processes(job_q, result_q)
+        return self.processes
+
+    def run_tasks(self, task_dispatcher):
+        try:
+            super(ForkRunner, self).run_tasks(task_dispatcher)
+        except BaseException:
+            # MRunner only stops workers created with its own Process class
+            for process in self.processes:
+                if process.is_alive():
+                    process.terminate()
+            raise
+
+    def execute_task_subprocess(self, job_q, result_q):
+        # In the worker, act like the workers of MRunner: send reports to
+        # the main process and update tasks with the data sent with them.
+        self.Child = multiprocessing.Process
+        # Counted by the main process before the fork
+        CacheStats.take_counts()
+        return super(ForkRunner, self).execute_task_subprocess(job_q, _StatsQueue(result_q))
+
+    def _process_result(self, node, task, result):
+        CacheStats.add_counts(result.pop('cache_stats', ()))
+        super(ForkRunner, self)._process_result(node, task, result)
+
+
+class _StatsQueue(object):
+
+    """Add the cache counters of the worker to the task results it sends."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def put(self, result):
+        if 'task' in result or 'failure' in result:
+            result['cache_stats'] = CacheStats.take_counts()
+        self.queue.put(result)
@@ -31,6 +31,7 @@ from collections import defaultdict, Callable
 import calendar
 import datetime
 import dateutil.tz
+import fnmatch
 import hashlib
 import locale
 import logging
@@ -146,7 +147,9 @@ __all__ = ['get_theme_path', 'get_theme_chain', 'load_messages', 'copy_tree',
            '_reload', 'unicode_str', 'bytes_str', 'unichr', 'Functionary',
            'TranslatableSetting', 'LocaleBorg', 'sys_encode', 'sys_decode',
            'makedirs', 'get_parent_theme_name', 'demote_headers',
-           'get_translation_candidate', 'write_metadata']
+           'get_translation_candidate', 'get_translation_resolver',
+           'TranslationResolver', 'write_metadata', 'SourceIndex',
+           'CacheStats', 'LRUCache', 'ConfigSerializer']
 
 
 ENCODING = sys.getfilesystemencoding() or sys.stdin.encoding
@@ -175,6 +178,109 @@ def makedirs(path):
     os.makedirs(path)
 
 
+class CacheStats(object):
+
+    """Hit and miss counters for one of Nikola's in-memory caches.
+
+    Every instance is kept in CacheStats.registry, so all the counters
+    can be reported at the end of a build.
+    """
+
+    registry = []
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        CacheStats.registry.append(self)
+
+    def __str__(self):
+        return '{0}: {1} hits, {2} misses'.format(self.name, self.hits, self.misses)
+
+    @classmethod
+    def take_counts(cls):
+        """Return the counters that changed as a picklable list, and reset them.
+
+        Used by the workers of parallel builds to send their counters to
+        the main process, which adds them to its own with add_counts.
+        """
+        counts = []
+        for i, stats in enumerate(cls.registry):
+            if stats.hits or stats.misses:
+                counts.append((i, stats.name, stats.hits, stats.misses))
+                stats.hits = stats.misses = 0
+        return counts
+
+    @classmethod
+    def add_counts(cls, counts):
+        """Add counters returned by take_counts in another process."""
+        for i, name, hits, misses in counts:
+            if i < len(cls.registry) and cls.registry[i].name == name:
+                stats = cls.registry[i]
+            else:  # Created in the other process only
+                stats = next((s for s in cls.registry if s.name == name), None) or CacheStats(name)
+            stats.hits += hits
+            stats.misses += misses
+
+
+class LRUCache(object):
+
+    """A dictionary-like cache that keeps at most maxsize items.
+
+    When it is full, the quarter of the items that were used least
+    recently is dropped.  If stats (a CacheStats) is given, hits and
+    misses of get() are counted in it.
+
+    >>> cache = LRUCache(4)
+    >>> for i in range(4):
+    ...     cache[i] = i
+    >>> cache.get(0)
+    0
+    >>> cache[4] = 4
+    >>> sorted(cache.keys())
+    [0, 2, 3, 4]
+    """
+
+    def __init__(self, maxsize, stats=None):
+        self.maxsize = maxsize
+        self.stats = stats
+        self._data = {}
+        self._tick = 0
+
+    def get(self, key, default=None):
+        try:
+            item = self._data[key]
+        except KeyError:
+            if self.stats is not None:
+                self.stats.misses += 1
+            return default
+        if self.stats is not None:
+            self.stats.hits += 1
+        self._tick += 1
+        item[1] = self._tick
+        return item[0]
+
+    def __setitem__(self, key, value):
+        if key not in self._data and len(self._data) >= self.maxsize:
+            by_age = sorted(self._data.items(), key=lambda item: item[1][1])
+            for old_key, _ in by_age[:max(1, self.maxsize // 4)]:
+                del self._data[old_key]
+        self._tick += 1
+        self._data[key] = [value, self._tick]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        return self._data.keys()
+
+    def clear(self):
+        self._data.clear()
+
+
 class Functionary(defaultdict):
 
     """Class that looks like a function, but is a defaultdict."""
@@ -393,14 +499,102 @@ class CustomEncoder(json.JSONEncoder):
             return s
 
 
+class ConfigSerializer(object):
+
+    """Serialize the dictionaries given to config_changed.
+
+    The result is the same as json.dumps(obj, cls=CustomEncoder,
+    sort_keys=True), but dictionaries are written key by key, and once a
+    dictionary is seen a second time (GLOBAL_CONTEXT or the kw of a task
+    plugin, which are in the config of many tasks) its serialization is
+    kept and reused instead of being done again for every task.
+
+    A kept serialization is only reused if the dictionary still has the
+    same keys, with the same objects as values (recursively, for the
+    dictionaries in it).  Values are compared by identity: a list or
+    another object changed in place is not noticed, so shared values
+    must be replaced, not modified, while tasks are loaded.  Every
+    object is kept alive until reset(), which is called before the
+    tasks of each build are loaded, so that its id is not reused.
+    """
+
+    def __init__(self, stats=None):
+        self.encoder = CustomEncoder(sort_keys=True)
+        self.stats = stats
+        self.reset()
+
+    def reset(self):
+        # seen maps id(obj) to obj; shared maps id(obj) to
+        # (obj, snapshot, serialization), see _dumps.
+        self.seen = {}
+        self.shared = {}
+
+    def encode_key(self, key):
+        if isinstance(key, unicode_str):
+            return self.encoder.encode(key)
+        # Let json turn numbers, booleans and None into keys.
+        return self.encoder.encode({key: None})[1:-len(': null}')]
+
+    def dumps(self, obj):
+        return self._dumps(obj)[0]
+
+    def _dumps(self, obj):
+        """Return the serialization of obj and its snapshot.
+
+        The snapshot is a list of (key, value, snapshot of value, if it
+        is a dictionary) tuples.
+        """
+        key = id(obj)
+        cached = self.shared.get(key)
+        if cached is not None and _unchanged(obj, cached[1]):
+            if self.stats is not None:
+                self.stats.hits += 1
+            return cached[2], cached[1]
+        if self.stats is not None:
+            self.stats.misses += 1
+        items = []
+        snapshot = []
+        for k, value in sorted(obj.items(), key=lambda item: item[0]):
+            if isinstance(value, dict):
+                data, value_snapshot = self._dumps(value)
+            else:
+                data, value_snapshot = self.encoder.encode(value), None
+            items.append(self.encode_key(k) + ': ' + data)
+            snapshot.append((k, value, value_snapshot))
+        data = '{' + ', '.join(items) + '}'
+        if key in self.seen or cached is not None:
+            self.seen.pop(key, None)
+            self.shared[key] = (obj, snapshot, data)
+        else:
+            self.seen[key] = obj
+        return data, snapshot
+
+
+def _unchanged(obj, snapshot):
+    """Tell if obj still has the keys and values in snapshot."""
+    if len(obj) != len(snapshot):
+        return False
+    for key, value, value_snapshot in snapshot:
+        try:
+            if obj[key] is not value:
+                return False
+        except KeyError:
+            return False
+        if value_snapshot is not None and not _unchanged(value, value_snapshot):
+            return False
+    return True
+
+
 class config_changed(tools.config_changed):
     """ A copy of doit's but using pickle instead of serializing manually."""
 
+    serializer = ConfigSerializer(CacheStats('config_changed'))
+
     def _calc_digest(self):
         if isinstance(self.config, str):
             return self.config
         elif isinstance(self.config, dict):
-            data = json.dumps(self.config, cls=CustomEncoder, sort_keys=True)
+            data = self.serializer.dumps(self.config)
             if isinstance(data, str):  # pragma: no cover # python3
                 byte_data = data.encode("utf-8")
             else:
@@ -1015,31 +1209,144 @@ def get_translation_candidate(config, path, lang):
     cache/posts/fancy.post.html.es
 
     """
-    # FIXME: this is rather slow and this function is called A LOT
-    # Convert the pattern into a regexp
-    pattern = config['TRANSLATIONS_PATTERN']
-    # This will still break if the user has ?*[]\ in the pattern. But WHY WOULD HE?
-    pattern = pattern.replace('.', r'\.')
-    pattern = pattern.replace('{path}', '(?P<path>.+?)')
-    pattern = pattern.replace('{ext}', '(?P<ext>[^\./]+)')
-    pattern = pattern.replace('{lang}', '(?P<lang>{0})'.format('|'.join(config['TRANSLATIONS'].keys())))
-    m = re.match(pattern, path)
-    if m and all(m.groups()):  # It's a translated path
-        p, e, l = m.group('path'), m.group('ext'), m.group('lang')
-        if l == lang:  # Nothing to do
+    return get_translation_resolver(config).candidate(path, lang)
+
+
+class TranslationResolver(object):
+
+    """Find the translations of paths according to TRANSLATIONS_PATTERN.
+
+    The pattern is turned into a regular expression only once.  Use
+    get_translation_resolver to get the resolver for a site configuration.
+
+    >>> resolver = TranslationResolver('{path}.{lang}.{ext}', ['en', 'es', 'pl'], 'en')
+    >>> candidates = resolver.candidates('posts/fancy.post.es.rst')
+    >>> print(candidates['en'], candidates['es'], candidates['pl'])
+    posts/fancy.post.rst posts/fancy.post.es.rst posts/fancy.post.pl.rst
+    >>> [sorted(c.values()) for c in resolver.batch(['a.rst', 'b.txt'], ['pl'])]
+    [['a.pl.rst'], ['b.pl.txt']]
+    """
+
+    def __init__(self, pattern, langs, default_lang):
+        self.pattern = pattern
+        self.langs = list(langs)
+        self.default_lang = default_lang
+        # This will still break if the user has ?*[]\ in the pattern. But WHY WOULD HE?
+        regexp = pattern.replace('.', r'\.')
+        regexp = regexp.replace('{path}', '(?P<path>.+?)')
+        regexp = regexp.replace('{ext}', '(?P<ext>[^\./]+)')
+        regexp = regexp.replace('{lang}', '(?P<lang>{0})'.format('|'.join(self.langs)))
+        self.regexp = re.compile(regexp)
+
+    def split(self, path):
+        """Return (path, ext, lang) for path; lang is None if it is untranslated."""
+        m = self.regexp.match(path)
+        if m and all(m.groups()):  # It's a translated path
+            return m.group('path'), m.group('ext'), m.group('lang')
+        else:
+            # It's a untranslated path, assume it's path.ext
+            p, e = os.path.splitext(path)
+            return p, e[1:], None  # No initial dot
+
+    def _candidate(self, path, p, e, l, lang):
+        if l == lang or (l is None and lang == self.default_lang):  # Nothing to do
             return path
-        elif lang == config['DEFAULT_LANG']:  # Return untranslated path
+        elif lang == self.default_lang:  # Return untranslated path
             return '{0}.{1}'.format(p, e)
         else:  # Change lang and return
-            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
-    else:
-        # It's a untranslated path, assume it's path.ext
-        p, e = os.path.splitext(path)
-        e = e[1:]  # No initial dot
-        if lang == config['DEFAULT_LANG']:  # Nothing to do
-            return path
-        else:  # Change lang and return
-            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
+            return self.pattern.format(path=p, ext=e, lang=lang)
+
+    def candidate(self, path, lang):
+        """Return the path of the lang translation of path."""
+        p, e, l = self.split(path)
+        return self._candidate(path, p, e, l, lang)
+
+    def candidates(self, path, langs=None):
+        """Return a {lang: path} dict of translations of path.
+
+        All languages are included unless langs is given.
+        """
+        p, e, l = self.split(path)
+        if langs is None:
+            langs = self.langs
+        return dict((lang, self._candidate(path, p, e, l, lang)) for lang in langs)
+
+    def batch(self, paths, langs=None):
+        """Return a list with the candidates dict of each path in paths."""
+        return [self.candidates(path, langs) for path in paths]
+
+
+_translation_resolvers = {}
+
+
+def get_translation_resolver(config):
+    """Return the TranslationResolver for the site configuration config."""
+    key = (config['TRANSLATIONS_PATTERN'], tuple(config['TRANSLATIONS']),
+           config['DEFAULT_LANG'])
+    try:
+        return _translation_resolvers[key]
+    except KeyError:
+        resolver = TranslationResolver(*key)
+        _translation_resolvers[key] = resolver
+        return resolver
+
+
+class SourceIndex(object):
+
+    """An in-memory index of the files in post source folders.
+
+    Each folder is listed once, with add_folder.  After that, questions
+    about files in indexed folders, including which translations of a
+    source exist, are answered without touching the filesystem.  Paths
+    in folders that were not indexed are checked on disk.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.folders = {}
+
+    def add_folder(self, dirpath, filenames):
+        """Index the files in dirpath, as listed by os.walk."""
+        self.folders[dirpath] = set(filenames)
+
+    def _lookup(self, path):
+        """Return whether path is a file, or None if its folder is not indexed."""
+        dirpath, name = os.path.split(path)
+        names = self.folders.get(dirpath)
+        if names is None:
+            return None
+        return name in names
+
+    def isfile(self, path):
+        """Like os.path.isfile."""
+        found = self._lookup(path)
+        if found is None:
+            return os.path.isfile(path)
+        return found
+
+    def exists(self, path):
+        """Like os.path.exists, but only files in indexed folders exist."""
+        found = self._lookup(path)
+        if found is None:
+            return os.path.exists(path)
+        return found
+
+    def glob(self, dirpath, pattern):
+        """Return the files in the indexed folder dirpath matching pattern."""
+        return [os.path.join(dirpath, name) for name in
+                fnmatch.filter(self.folders[dirpath], pattern)]
+
+    def translations(self, source_path):
+        """Return a {lang: path} dict of the existing translations of source_path.
+
+        The default language is included if source_path itself exists.
+        """
+        found = {}
+        candidates = get_translation_resolver(self.config).candidates(source_path)
+        for lang, candidate in candidates.items():
+            if self.isfile(candidate):
+                found[lang] = candidate
+        return found
 
 
 def write_metadata(data):
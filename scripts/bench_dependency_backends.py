@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Time a no-op build's dependency checks with each doit backend.
+
+nikola-sqlite is doit's dependency manager with Nikola's SQLite DB, the
+nikola-<DEPENDENCY_BACKEND>-<FILE_DEP_CHECK> ones are what builds use.
+
+The state of N tasks (100000 by default) with two file dependencies each
+is saved, then the database is opened again, every task is checked
+(they are all up to date) and it is closed, as in a build where nothing
+changed.
+"""
+
+from __future__ import unicode_literals, print_function
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from doit.dependency import backend_map  # NOQA
+from doit.task import Task  # NOQA
+import nikola.dependency  # NOQA, registers the nikola-* backends
+
+BACKENDS = ['dbm', 'json', 'sqlite3', 'nikola-sqlite',
+            'nikola-dbm-md5', 'nikola-sqlite-md5', 'nikola-sqlite-timestamp']
+
+
+def make_tasks(folder, count):
+    deps = []
+    for name in ('base.tmpl', 'post.tmpl'):
+        deps.append(os.path.join(folder, name))
+        with open(deps[-1], 'w') as outf:
+            outf.write(name)
+    return [Task('render_posts:output/posts/{0}.html'.format(i), None, file_dep=deps)
+            for i in range(count)]
+
+
+def bench(backend, folder, tasks):
+    db_file = os.path.join(folder, '.doit.' + backend)
+    dep_manager = backend_map[backend](db_file)
+    for task in tasks:
+        dep_manager.save_success(task)
+    dep_manager.close()
+
+    start = time.time()
+    tasks_dict = {}
+    dep_manager = backend_map[backend](db_file)
+    for task in tasks:
+        assert dep_manager.get_status(task, tasks_dict) == 'up-to-date'
+    dep_manager.close()
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for backend in BACKENDS:
+        folder = tempfile.mkdtemp()
+        try:
+            tasks = make_tasks(folder, count)
+            print('{0:>23}: {1:.2f}s for {2} tasks'.format(
+                backend, bench(backend, folder, tasks), count))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
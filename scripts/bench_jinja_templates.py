@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare cold and warm loading of the bootstrap3-jinja templates.
+
+Cold runs start with an empty cache folder, warm runs reuse the bytecode
+cache and template dependencies saved by the previous run.
+"""
+
+from __future__ import unicode_literals, print_function
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nikola.plugins.template.jinja import JinjaTemplates  # NOQA
+
+THEMES = os.path.join(os.path.dirname(__file__), '..', 'nikola', 'data', 'themes')
+DIRECTORIES = [os.path.join(THEMES, theme, 'templates')
+               for theme in ('bootstrap3-jinja', 'bootstrap-jinja', 'base-jinja')]
+TEMPLATES = sorted(set(os.path.basename(path) for directory in DIRECTORIES
+                       for path in glob.glob(os.path.join(directory, '*.tmpl'))))
+
+
+def load(cache_folder):
+    """Load every template and its dependencies, like at the start of a build."""
+    JinjaTemplates.dependency_cache = {}
+    templates = JinjaTemplates()
+    templates.set_directories(list(DIRECTORIES), cache_folder)
+    for name in TEMPLATES:
+        templates.template_deps(name)
+        templates.lookup.get_template(name)
+
+
+def cold(cache_folder):
+    shutil.rmtree(cache_folder, ignore_errors=True)
+    load(cache_folder)
+
+
+if __name__ == '__main__':
+    cache_folder = tempfile.mkdtemp()
+    try:
+        for name, func in (('cold', cold), ('warm', load)):
+            best = min(timeit.repeat(lambda: func(cache_folder), number=5, repeat=3))
+            print('{0:>5}: {1:.4f}s for {2} templates'.format(name, best / 5, len(TEMPLATES)))
+    finally:
+        shutil.rmtree(cache_folder, ignore_errors=True)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Report how many bytes each Post object uses.
+
+Usage: bench_post_memory.py [posts] [languages]
+
+Needs Python 3.4 or newer (for tracemalloc).
+"""
+
+from __future__ import unicode_literals, print_function
+from collections import defaultdict
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import dateutil.tz  # NOQA
+from nikola.post import Post  # NOQA
+from nikola.utils import LocaleBorg  # NOQA
+
+
+class FakeCompiler(object):
+    demote_headers = False
+
+    def compile_html(self, source, dest, is_two_file=True):
+        pass
+
+
+def make_config(langs):
+    config = defaultdict(str)
+    config.update({
+        '__tzinfo__': dateutil.tz.tzutc(),
+        'BASE_URL': 'http://example.com/',
+        'CACHE_FOLDER': 'cache',
+        'DEFAULT_LANG': langs[0],
+        'FUTURE_IS_NOW': True,
+        'INDEX_FILE': 'index.html',
+        'SHOW_UNTRANSLATED_POSTS': True,
+        'TRANSLATIONS': dict((lang, './' + lang) for lang in langs),
+        'TRANSLATIONS_PATTERN': '{path}.{lang}.{ext}',
+        'FILE_METADATA_REGEXP': None,
+    })
+    config['TRANSLATIONS'][langs[0]] = ''
+    return config
+
+
+def make_posts(folder, count, langs):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, 'post-{0}.rst'.format(i))
+        for lang in langs:
+            name = path if lang == langs[0] else path[:-4] + '.' + lang + '.rst'
+            with open(name, 'w') as outf:
+                outf.write('.. title: Post {0} ({1})\n.. slug: post-{0}\n'
+                           '.. date: 2014-01-01 10:00\n.. tags: a, b, c\n'
+                           '.. description: Some description\n\nText.\n'.format(i, lang))
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    nlangs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    langs = ['l{0}'.format(i) for i in range(nlangs)]
+    config = make_config(langs)
+    LocaleBorg.initialize(dict((lang, 'C') for lang in langs), langs[0])
+    compiler = FakeCompiler()
+    messages = {}
+    folder = tempfile.mkdtemp()
+    try:
+        paths = make_posts(folder, count, langs)
+        # Create one post first so module level caches don't get counted
+        Post(paths[0], config, 'posts', True, messages, 'post.tmpl', compiler)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        posts = [Post(path, config, 'posts', True, messages, 'post.tmpl', compiler)
+                 for path in paths]
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(folder)
+    print('{0} posts, {1} languages: {2:.0f} bytes per post'.format(
+        len(posts), nlangs, (after - before) / len(posts)))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare get_translation_candidate calls/second with the old implementation."""
+
+from __future__ import unicode_literals, print_function
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nikola.utils import get_translation_candidate  # NOQA
+
+CONFIG = {
+    'TRANSLATIONS_PATTERN': '{path}.{lang}.{ext}',
+    'DEFAULT_LANG': 'en',
+    'TRANSLATIONS': {'en': '', 'es': './es', 'pl': './pl', 'de': './de'},
+}
+PATHS = ['posts/some-post-{0}.rst'.format(i) for i in range(50)]
+PATHS += ['posts/some-post-{0}.es.rst'.format(i) for i in range(50)]
+
+
+def old_get_translation_candidate(config, path, lang):
+    """The implementation before the pattern was compiled once."""
+    pattern = config['TRANSLATIONS_PATTERN']
+    # This will still break if the user has ?*[]\ in the pattern. But WHY WOULD HE?
+    pattern = pattern.replace('.', r'\.')
+    pattern = pattern.replace('{path}', '(?P<path>.+?)')
+    pattern = pattern.replace('{ext}', r'(?P<ext>[^\./]+)')
+    pattern = pattern.replace('{lang}', '(?P<lang>{0})'.format('|'.join(config['TRANSLATIONS'].keys())))
+    m = re.match(pattern, path)
+    if m and all(m.groups()):  # It's a translated path
+        p, e, l = m.group('path'), m.group('ext'), m.group('lang')
+        if l == lang:  # Nothing to do
+            return path
+        elif lang == config['DEFAULT_LANG']:  # Return untranslated path
+            return '{0}.{1}'.format(p, e)
+        else:  # Change lang and return
+            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
+    else:
+        # It's a untranslated path, assume it's path.ext
+        p, e = os.path.splitext(path)
+        e = e[1:]  # No initial dot
+        if lang == config['DEFAULT_LANG']:  # Nothing to do
+            return path
+        else:  # Change lang and return
+            return config['TRANSLATIONS_PATTERN'].format(path=p, ext=e, lang=lang)
+
+
+def run(func):
+    for path in PATHS:
+        for lang in CONFIG['TRANSLATIONS']:
+            func(CONFIG, path, lang)
+
+
+if __name__ == '__main__':
+    calls = len(PATHS) * len(CONFIG['TRANSLATIONS'])
+    for name, func in (('before', old_get_translation_candidate),
+                       ('after', get_translation_candidate)):
+        best = min(timeit.repeat(lambda: run(func), number=20, repeat=5))
+        print('{0:>6}: {1:10.0f} calls/second'.format(name, calls * 20 / best))
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+# This code is so you can run the samples without installing the package,
+# and should be before any import touching nikola, in any file under tests/
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import shutil
+import tempfile
+import unittest
+
+import mock
+from doit.dependency import DbmDB, backend_map, get_file_md5
+from doit.task import Task
+
+from nikola.dependency import SqliteDB, SqliteDependency, doit_backend
+
+
+class SqliteDBTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, '.doit.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip(self):
+        db = SqliteDB(self.path)
+        db.set('a', 'deps:', ['x', 'y'])
+        db.set('a', 'result:', 'abc')
+        db.set('b', 'deps:', [])
+        db.dump()
+        db = SqliteDB(self.path)
+        self.assertEqual(['x', 'y'], db.get('a', 'deps:'))
+        self.assertEqual('abc', db.get('a', 'result:'))
+        self.assertTrue(db.in_('b'))
+        self.assertFalse(db.in_('c'))
+        self.assertEqual(None, db.get('c', 'deps:'))
+
+    def test_batches_are_written_before_closing(self):
+        db = SqliteDB(self.path)
+        db.batch_size = 2
+        db.set('a', 'result:', 1)
+        db.set('b', 'result:', 2)
+        db.set('c', 'result:', 3)
+        other = SqliteDB(self.path)
+        self.assertEqual(1, other.get('a', 'result:'))
+        self.assertEqual(2, other.get('b', 'result:'))
+        self.assertFalse(other.in_('c'))
+
+    def test_remove(self):
+        db = SqliteDB(self.path)
+        db.set('a', 'result:', 1)
+        db.set('b', 'result:', 2)
+        db.dump()
+        db = SqliteDB(self.path)
+        db.remove('a')
+        self.assertFalse(db.in_('a'))
+        db.dump()
+        db = SqliteDB(self.path)
+        self.assertFalse(db.in_('a'))
+        self.assertTrue(db.in_('b'))
+        db.remove_all()
+        self.assertFalse(db.in_('b'))
+
+    def test_import_dbm(self):
+        old = DbmDB(os.path.join(self.tmpdir, '.doit.db'))
+        old.set('a', 'result:', 'abc')
+        old.dump()
+        dep = SqliteDependency(self.path)
+        self.assertEqual('abc', dep._get('a', 'result:'))
+        dep.close()
+
+    def test_import_json(self):
+        with open(os.path.join(self.tmpdir, '.doit.db'), 'w') as outf:
+            json.dump({'a': {'result:': 'abc'}}, outf)
+        dep = SqliteDependency(self.path)
+        self.assertEqual('abc', dep._get('a', 'result:'))
+        dep.close()
+
+
+class CachedDependencyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.template = os.path.join(self.tmpdir, 'base.tmpl')
+        with open(self.template, 'w') as outf:
+            outf.write('template')
+        self.tasks = []
+        for i in range(3):
+            target = os.path.join(self.tmpdir, '{0}.html'.format(i))
+            with open(target, 'w') as outf:
+                outf.write('page')
+            self.tasks.append(Task(target, None, file_dep=[self.template], targets=[target]))
+        self.dep_manager = self.manager()
+        for task in self.tasks:
+            self.dep_manager.save_success(task)
+
+    def tearDown(self):
+        self.dep_manager.close()
+        shutil.rmtree(self.tmpdir)
+
+    def manager(self):
+        name, dep_file = doit_backend('dbm', 'md5')
+        return backend_map[name](os.path.join(self.tmpdir, dep_file))
+
+    def statuses(self):
+        self.dep_manager.close()
+        self.dep_manager = self.manager()
+        return [self.dep_manager.get_status(task, {}) for task in self.tasks]
+
+    def test_files_are_hashed_once(self):
+        os.utime(self.template, (1, 1))
+        with mock.patch('nikola.dependency.get_file_md5', return_value='x') as get_file_md5:
+            self.assertEqual(['run'] * 3, self.statuses())
+        self.assertEqual(1, get_file_md5.call_count)
+
+    def test_touched_files_are_hashed_once(self):
+        os.utime(self.template, (1, 1))
+        with mock.patch('nikola.dependency.get_file_md5', wraps=get_file_md5) as nikola_md5:
+            with mock.patch('doit.dependency.get_file_md5') as doit_md5:
+                self.assertEqual(['up-to-date'] * 3, self.statuses())
+        self.assertEqual(1, nikola_md5.call_count)
+        self.assertFalse(doit_md5.called)
+
+    def test_saved_states(self):
+        self.dep_manager.close()
+        self.dep_manager = self.manager()
+        with mock.patch('nikola.dependency.get_file_md5', return_value='x') as md5:
+            for task in self.tasks:
+                self.dep_manager.remove_success(task)
+                self.dep_manager.save_success(task)
+        self.assertEqual(1, md5.call_count)
+        state = self.dep_manager._get(self.tasks[2].name, self.template)
+        self.assertEqual([os.path.getmtime(self.template), len('template'), 'x'], list(state))
+
+    def test_touched_files_are_hashed(self):
+        # doit keeps the old time when the contents did not change
+        os.utime(self.template, (1, 1))
+        self.assertEqual(['up-to-date'] * 3, self.statuses())
+        with mock.patch('nikola.dependency.get_file_md5') as get_file_md5:
+            self.statuses()
+        self.assertTrue(get_file_md5.called)
+
+
+class TimestampDependencyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dep = os.path.join(self.tmpdir, 'image.jpg')
+        self.target = os.path.join(self.tmpdir, 'thumbnail.jpg')
+        with open(self.dep, 'w') as outf:
+            outf.write('image')
+        with open(self.target, 'w') as outf:
+            outf.write('thumbnail')
+        self.task = Task('thumbnail', None, file_dep=[self.dep], targets=[self.target])
+        self.manager().save_success(self.task)
+
+    def tearDown(self):
+        self.dep_manager.close()
+        shutil.rmtree(self.tmpdir)
+
+    def manager(self):
+        if hasattr(self, 'dep_manager'):
+            self.dep_manager.close()
+        name, dep_file = doit_backend('sqlite', 'timestamp')
+        self.dep_manager = backend_map[name](os.path.join(self.tmpdir, dep_file))
+        return self.dep_manager
+
+    def status(self):
+        return self.manager().get_status(self.task, {})
+
+    def test_unchanged(self):
+        with mock.patch('nikola.dependency.get_file_md5') as get_file_md5:
+            self.assertEqual('up-to-date', self.status())
+        self.assertFalse(get_file_md5.called)
+
+    def test_touched_files_are_hashed_once(self):
+        os.utime(self.dep, (1, 1))
+        self.assertEqual('up-to-date', self.status())
+        with mock.patch('nikola.dependency.get_file_md5') as get_file_md5:
+            self.assertEqual('up-to-date', self.status())
+        self.assertFalse(get_file_md5.called)
+
+    def test_modified(self):
+        with open(self.dep, 'w') as outf:
+            outf.write('a bigger image')
+        self.assertEqual('run', self.status())
+        self.assertEqual([self.dep], self.task.dep_changed)
+
+    def test_modified_same_size(self):
+        with open(self.dep, 'w') as outf:
+            outf.write('IMAGE')
+        os.utime(self.dep, (1, 1))
+        self.assertEqual('run', self.status())
+
+    def test_modified_same_time(self):
+        mtime = os.path.getmtime(self.dep)
+        with open(self.dep, 'w') as outf:
+            outf.write('a bigger image')
+        os.utime(self.dep, (mtime, mtime))
+        self.assertEqual('run', self.status())
+
+    def test_targets_are_stated_again(self):
+        dep_manager = self.manager()
+        dep_manager.backend.stat(self.target)
+        with open(self.target, 'w') as outf:
+            outf.write('a new thumbnail')
+        dep_manager.save_success(self.task)
+        self.assertEqual(len('a new thumbnail'), dep_manager.backend.stat(self.target)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
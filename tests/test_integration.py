@@ -15,7 +15,9 @@ import tempfile
 import unittest
 
 import lxml.html
+import mock
 import pytest
+from doit.dependency import get_file_md5
 
 from nikola import __main__
 import nikola
@@ -124,6 +126,49 @@ class RepeatedPostsSetting(DemoBuildTest):
             outf.write('\nPOSTS = (("posts/*.txt", "posts", "post.tmpl"),("posts/*.txt", "posts", "post.tmpl"))\n')
 
 
+class SqliteBackendTest(DemoBuildTest):
+    """Build with the state of tasks kept in SQLite."""
+
+    @classmethod
+    def patch_site(self):
+        conf_path = os.path.join(self.target_dir, "conf.py")
+        with codecs.open(conf_path, "ab", "utf8") as outf:
+            outf.write("\nDEPENDENCY_BACKEND = 'sqlite'\n")
+
+    def test_second_build_does_nothing(self):
+        self.assertTrue(os.path.isfile(os.path.join(self.target_dir, '.doit.sqlite')))
+        self.assertFalse(os.path.exists(os.path.join(self.target_dir, '.doit.db')))
+        with cd(self.target_dir):
+            with mock.patch('doit.reporter.ExecutedOnlyReporter.execute_task') as execute_task:
+                self.assertEqual(0, __main__.main(["build"]))
+        # Hidden tasks, like _scan_locs, always run and are not reported
+        executed = [call[0][0].name for call in execute_task.call_args_list
+                    if call[0][0].actions and not call[0][0].name.startswith('_')]
+        self.assertEqual([], executed)
+
+
+class TimestampCheckTest(SqliteBackendTest):
+    """Build checking files by time and size."""
+
+    @classmethod
+    def patch_site(self):
+        conf_path = os.path.join(self.target_dir, "conf.py")
+        with codecs.open(conf_path, "ab", "utf8") as outf:
+            outf.write("\nDEPENDENCY_BACKEND = 'sqlite'\nFILE_DEP_CHECK = 'timestamp'\n")
+
+    def test_touched_files_are_hashed_once(self):
+        for root, dirs, files in os.walk(os.path.join(self.target_dir, 'posts')):
+            for name in files:
+                os.utime(os.path.join(root, name), (1, 1))
+        with cd(self.target_dir):
+            with mock.patch('nikola.dependency.get_file_md5', wraps=get_file_md5) as md5:
+                self.test_second_build_does_nothing()
+            self.assertTrue(md5.called)
+            with mock.patch('nikola.dependency.get_file_md5') as md5:
+                self.test_second_build_does_nothing()
+            self.assertFalse(md5.called)
+
+
 class FuturePostTest(EmptyBuildTest):
     """Test a site with future posts."""
 
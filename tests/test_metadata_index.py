@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+# This code is so you can run the samples without installing the package,
+# and should be before any import touching nikola, in any file under tests/
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import shutil
+import tempfile
+import unittest
+
+import mock
+from nikola.post import MetadataIndex
+
+
+class dummy(object):
+    pass
+
+
+class MetadataIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.tmpdir, 'cache', 'metadata_index.json')
+        self.config = {
+            'DEFAULT_LANG': 'en',
+            'TRANSLATIONS': {'en': '', 'es': './es'},
+            'TRANSLATIONS_PATTERN': '{path}.{lang}.{ext}',
+            'FILE_METADATA_REGEXP': None,
+            'post_pages': [['posts/*.txt', 'posts', 'post.tmpl', True]],
+        }
+        self.post = dummy()
+        self.post.source_path = os.path.join(self.tmpdir, 'post.txt')
+        self.post.metadata_path = os.path.join(self.tmpdir, 'post.meta')
+        with open(self.post.source_path, 'w') as outf:
+            outf.write('.. title: Foo\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def store(self):
+        index = MetadataIndex(self.index_path, self.config)
+        signature = index.signature(self.post)
+        index.set(self.post.source_path, signature,
+                  {'is_two_file': False, 'meta': {'en': {'title': 'Foo'}}})
+        index.save()
+
+    def lookup(self):
+        index = MetadataIndex(self.index_path, self.config)
+        return index.get(self.post.source_path, index.signature(self.post))
+
+    def test_roundtrip(self):
+        self.store()
+        entry = self.lookup()
+        self.assertEqual('Foo', entry['meta']['en']['title'])
+        self.assertFalse(entry['is_two_file'])
+
+    def test_modified_source(self):
+        self.store()
+        with open(self.post.source_path, 'a') as outf:
+            outf.write('.. slug: foo\n')
+        self.assertIsNone(self.lookup())
+
+    def test_new_translation(self):
+        self.store()
+        with open(os.path.join(self.tmpdir, 'post.es.txt'), 'w') as outf:
+            outf.write('.. title: Foo\n')
+        self.assertIsNone(self.lookup())
+
+    def test_changed_config(self):
+        self.store()
+        self.config['FILE_METADATA_REGEXP'] = '(?P<slug>.*)'
+        self.assertIsNone(self.lookup())
+
+    def test_unseen_posts_are_dropped(self):
+        self.store()
+        index = MetadataIndex(self.index_path, self.config)
+        index.save()
+        self.assertIsNone(self.lookup())
+
+    def test_update_in_workers(self):
+        other_path = os.path.join(self.tmpdir, 'other.txt')
+        with open(other_path, 'w') as outf:
+            outf.write('.. title: Bar\n.. slug: bar\n')
+        index = MetadataIndex(self.index_path, self.config)
+        index.update([self.post.source_path, other_path], 2)
+        self.assertEqual('Foo', index.entries[self.post.source_path]['meta']['en']['title'])
+        self.assertEqual('bar', index.entries[other_path]['meta']['en']['slug'])
+        self.assertEqual({}, index.entries[other_path]['meta']['es'])
+        self.assertFalse(index.entries[other_path]['is_two_file'])
+
+    def test_workers_are_stopped_on_errors(self):
+        other_path = os.path.join(self.tmpdir, 'other.txt')
+        index = MetadataIndex(self.index_path, self.config)
+        with mock.patch('multiprocessing.Pool') as pool_class:
+            pool = pool_class.return_value
+            pool.map.side_effect = KeyboardInterrupt
+            self.assertRaises(KeyboardInterrupt, index.update,
+                              [self.post.source_path, other_path], 2)
+        self.assertTrue(pool.terminate.called)
+        self.assertTrue(pool.join.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
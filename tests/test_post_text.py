@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+# This code is so you can run the samples without installing the package,
+# and should be before any import touching nikola, in any file under tests/
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import codecs
+import io
+import json
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from nikola.post import Post, _hyphenate_fragment
+
+
+class dummy(object):
+    pass
+
+
+class FakePost(Post):
+    __slots__ = ('path',)
+
+    def permalink(self, lang=None, absolute=False, extension='.html'):
+        return 'http://example.com/posts/foo/'
+
+    def _translated_file_path(self, lang):
+        return self.path
+
+
+class PostTest(unittest.TestCase):
+    def test_other_attributes(self):
+        post = FakePost.__new__(FakePost)
+        post.custom = 'value'
+        self.assertEqual('value', post.custom)
+
+
+class PostTextTest(unittest.TestCase):
+    """Post.text() on a compiled fragment."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'post.html')
+        self.settings = settings = dummy()
+        settings.hyphenate = False
+        settings.config = {'READ_MORE_LINK': lambda lang: '<p class="more"><a href="{link}">{read_more}</a></p>'}
+        self.post = FakePost.__new__(FakePost)
+        self.post.path = self.path
+        self.post._settings = settings
+        self.post.demote_headers = 0
+        self.post._texts = None
+        self.post.messages = {'en': {'Read more': 'Read more'}}
+        self.post._info = None
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def text(self, data, **kw):
+        with io.open(self.path, 'w', encoding='utf8') as outf:
+            outf.write(data)
+        return self.post.text('en', **kw)
+
+    def test_full_text(self):
+        self.assertEqual('<p><a href="http://example.com/posts/foo/a.html">a</a></p><p>b</p>',
+                         self.text('<p><a href="a.html">a</a></p><p>b</p>'))
+
+    def test_teaser(self):
+        data = '<p>a</p><!-- TEASER_END --><p>b</p>'
+        self.assertEqual('<div><p>a</p><p class="more"><a href="http://example.com/posts/foo/">Read more</a></p></div>',
+                         self.text(data, teaser_only=True))
+        self.assertEqual('<p>a</p>', self.text(data, teaser_only=True, show_read_more_link=False))
+        self.assertEqual('a', self.text(data, teaser_only=True, strip_html=True))
+
+    def test_teaser_custom_text(self):
+        self.assertEqual('<div><p>a</p><p class="more"><a href="http://example.com/posts/foo/">More</a></p></div>',
+                         self.text('<p>a</p><!-- TEASER_END:More--><p>b</p>', teaser_only=True))
+
+    def test_teaser_inside_element(self):
+        self.assertEqual('<div><p>a</p></div>',
+                         self.text('<div><p>a</p><!-- TEASER_END --><p>b</p></div>',
+                                   teaser_only=True, show_read_more_link=False))
+
+    def test_demote_headers(self):
+        self.post.demote_headers = 1
+        self.assertEqual('<div><h2>a</h2><h3>b</h3></div>', self.text('<h1>a</h1><h2>b</h2>'))
+
+    def test_strip_html(self):
+        self.assertEqual('a & b', self.text('<p>a &amp; b</p>', strip_html=True))
+        self.assertEqual('text a', self.text('text <p>a</p>', strip_html=True))
+
+    def test_cached_until_file_changes(self):
+        self.assertEqual('<p>a</p>', self.text('<p>a</p>'))
+        self.post.demote_headers = 1  # Not seen while the file is the same
+        self.assertEqual('<p>a</p>', self.post.text('en'))
+        self.assertEqual('<h2>bb</h2>', self.text('<h1>bb</h1>'))
+
+    def test_text_stats(self):
+        self.text('<p>a b</p><!-- TEASER_END --><p>c</p><p>d</p>')
+        self.assertEqual({'reading_time': 1, 'remaining_reading_time': 1,
+                          'paragraph_count': 3, 'remaining_paragraph_count': 2},
+                         self.post.text_stats('en'))
+
+    def test_fragment_info_file(self):
+        self.text('<p>a</p><!-- TEASER_END --><p>b</p>')
+        stats = self.post.fragment_info('en', save=True)['stats']
+        self.assertTrue(os.path.isfile(self.path + '.info'))
+        self.post._info = None
+        with mock.patch.object(FakePost, '_calc_text_stats') as calc:
+            self.assertEqual(stats, self.post.text_stats('en'))
+            self.assertFalse(calc.called)
+        with io.open(self.path, 'w', encoding='utf8') as outf:
+            outf.write('<p>a</p><p>b</p><p>c</p>')
+        self.assertEqual(3, self.post.text_stats('en')['paragraph_count'])
+
+    def test_fragment_info_missing_fields(self):
+        self.text('<p>a</p><p>b</p>')
+        signature = self.post.fragment_info('en')['signature']
+        with io.open(self.path + '.info', 'w', encoding='utf8') as outf:
+            outf.write(json.dumps({'signature': signature}))
+        self.post._info = None
+        self.assertEqual(2, self.post.text_stats('en')['paragraph_count'])
+
+    def test_text_stats_empty(self):
+        self.text('')
+        stats = self.post.text_stats('en')
+        self.assertEqual(0, stats['paragraph_count'])
+        self.assertEqual(0, stats['remaining_paragraph_count'])
+
+    def test_recorded_teaser(self):
+        self.text('<p><a href="a.html">a</a></p>\n<!-- TEASER_END:More--><p>b</p>')
+        info = self.post.fragment_info('en', save=True)
+        self.assertEqual({'html': '<p><a href="a.html">a</a></p>\n', 'read_more': 'More'},
+                         info['teaser'])
+        self.post._texts = None
+        self.post._info = None
+        with mock.patch('nikola.post.codecs.open', side_effect=codecs.open) as open_:
+            self.assertEqual('<div><p><a href="http://example.com/posts/foo/a.html">a</a></p>\n'
+                             '<p class="more"><a href="http://example.com/posts/foo/">More</a></p></div>',
+                             self.post.text('en', teaser_only=True))
+        # Only the .info file was read
+        self.assertEqual([self.path + '.info'], [c[1][0] for c in open_.mock_calls if c[0] == ''])
+
+    def test_info_without_teaser(self):
+        # .info files written before teasers were recorded
+        self.text('<p>a</p><!-- TEASER_END --><p>b</p>')
+        info = dict(self.post.fragment_info('en'))
+        del info['teaser']
+        with io.open(self.path + '.info', 'w', encoding='utf8') as outf:
+            outf.write(json.dumps(info))
+        self.post._texts = None
+        self.post._info = None
+        self.assertEqual('<p>a</p>',
+                         self.post.text('en', teaser_only=True, show_read_more_link=False))
+        self.assertEqual('<p>a</p>', self.post.fragment_info('en')['teaser']['html'])
+
+    def test_recorded_teaser_inside_element(self):
+        self.text('<div><p>a</p><!-- TEASER_END --><p>b</p></div>')
+        self.assertEqual(None, self.post.fragment_info('en')['teaser']['html'])
+        self.assertEqual('<div><p>a</p></div>',
+                         self.post.text('en', teaser_only=True, show_read_more_link=False))
+
+    def test_hyphenate_at_compile(self):
+        data = '<p>Internationalization <b>everywhere</b></p><!-- TEASER_END --><p>b</p>'
+        self.settings.hyphenate = True
+        expected = self.text(data)
+        self.assertIn('\u00AD', expected)
+        self.settings.hyphenate = 'compile'
+        self.post._texts = None
+        _hyphenate_fragment(self.path, 'en')
+        self.assertEqual(expected, self.post.text('en'))
+
+
+if __name__ == '__main__':
+    unittest.main()
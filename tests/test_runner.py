@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+# This code is so you can run the samples without installing the package,
+# and should be before any import touching nikola, in any file under tests/
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import mock
+from doit import cmd_run
+from doit.runner import MRunner
+from nikola import runner
+from nikola.__main__ import Build, NikolaTaskLoader
+from nikola.utils import CacheStats
+
+
+class CacheStatsTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(CacheStats, 'registry', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.first = CacheStats('first')
+        self.second = CacheStats('second')
+
+    def test_counts_of_other_process(self):
+        self.second.hits = 3
+        self.second.misses = 1
+        counts = CacheStats.take_counts()
+        self.assertEqual([(1, 'second', 3, 1)], counts)
+        self.assertEqual((0, 0), (self.second.hits, self.second.misses))
+        self.second.hits = 1
+        CacheStats.add_counts(counts + [(2, 'third', 5, 0)])
+        self.assertEqual((4, 1), (self.second.hits, self.second.misses))
+        self.assertEqual(['first', 'second', 'third'], [s.name for s in CacheStats.registry])
+        self.assertEqual(5, CacheStats.registry[2].hits)
+
+    def test_counts_sent_with_task_results(self):
+        queue = mock.Mock()
+        results = runner._StatsQueue(queue)
+        self.first.misses = 2
+        results.put({'name': 'a', 'reporter': 'execute_task'})
+        self.assertNotIn('cache_stats', queue.put.call_args[0][0])
+        results.put({'name': 'a', 'task': {}})
+        result = queue.put.call_args[0][0]
+        self.assertEqual([(0, 'first', 0, 2)], result['cache_stats'])
+        self.assertEqual(0, self.first.misses)
+
+        with mock.patch('doit.runner.MRunner._process_result') as process_result:
+            fork_runner = runner.ForkRunner.__new__(runner.ForkRunner)
+            fork_runner._process_result('node', 'task', result)
+        self.assertEqual(2, self.first.misses)
+        self.assertNotIn('cache_stats', process_result.call_args[0][-1])
+
+
+class BuildTest(unittest.TestCase):
+    def test_runner_is_restored(self):
+        used = []
+
+        def execute(self, params, args):
+            used.append(cmd_run.MRunner)
+            raise KeyboardInterrupt
+
+        build = Build.__new__(Build)
+        with mock.patch('doit.cmd_run.Run.execute', execute):
+            self.assertRaises(KeyboardInterrupt, build.execute, {'num_process': 2}, [])
+        self.assertEqual([runner.ForkRunner], used)
+        self.assertIs(MRunner, cmd_run.MRunner)
+
+    def test_cache_stats(self):
+        build = Build.__new__(Build)
+        with mock.patch.object(CacheStats, 'registry', []):
+            CacheStats('links').hits = 3
+            with mock.patch('doit.cmd_run.Run.execute', return_value=0):
+                with mock.patch('nikola.__main__.LOGGER') as logger:
+                    self.assertEqual(0, build.execute({}, []))
+                    self.assertFalse(logger.info.called)
+                    self.assertEqual(0, build.execute({'cache_stats': True}, []))
+        logger.info.assert_called_once_with('links: 3 hits, 0 misses')
+
+
+class NikolaTaskLoaderTest(unittest.TestCase):
+    def setUp(self):
+        site = mock.Mock()
+        site.config = {'DEPENDENCY_BACKEND': 'dbm', 'FILE_DEP_CHECK': 'md5'}
+        site.gen_tasks.side_effect = self.gen_tasks
+        self.loader = NikolaTaskLoader(site, quiet=True)
+
+    def gen_tasks(self, name, plugin_category, doc):
+        yield {'basename': name, 'name': None, 'doc': doc}
+        yield {'basename': plugin_category.lower(), 'name': 'x', 'actions': []}
+
+    def late_task_deps(self, opt_values, pos_args):
+        tasks, doit_config = self.loader.load_tasks(None, opt_values, pos_args)
+        return [task.task_dep for task in tasks if task.name == 'latetask:x'][0]
+
+    def test_serial_build(self):
+        self.assertNotIn('render_site', self.late_task_deps({}, []))
+
+    def test_parallel_build(self):
+        self.assertIn('render_site', self.late_task_deps({'num_process': 2}, []))
+        self.assertIn('render_site', self.late_task_deps({'num_process': 2}, ['latetask']))
+
+
+if __name__ == '__main__':
+    unittest.main()
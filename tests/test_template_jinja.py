@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+# This code is so you can run the samples without installing the package,
+# and should be before any import touching nikola, in any file under tests/
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import io
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from nikola.plugins.template.jinja import JinjaTemplates
+
+
+class JinjaCacheTest(unittest.TestCase):
+    """Compiled templates and dependencies kept across runs."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.templates = os.path.join(self.tmpdir, 'templates')
+        os.makedirs(self.templates)
+        self.write('base.tmpl', '<b>{% block content %}{% endblock %}</b>')
+        self.write('page.tmpl', '{% extends "base.tmpl" %}{% block content %}{{ title }}{% endblock %}')
+        self.cache_folder = os.path.join(self.tmpdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, data):
+        with io.open(os.path.join(self.templates, name), 'w', encoding='utf8') as outf:
+            outf.write(data)
+
+    def make(self):
+        templates = JinjaTemplates()
+        templates.dependency_cache = {}
+        templates.set_directories([self.templates], self.cache_folder)
+        return templates
+
+    def test_render(self):
+        self.assertEqual('<b>Foo</b>', self.make().render_template('page.tmpl', None, {'title': 'Foo'}))
+        self.write('page.tmpl', '{% extends "base.tmpl" %}{% block content %}-{{ title }}-{% endblock %}')
+        self.assertEqual('<b>-Foo-</b>', self.make().render_template('page.tmpl', None, {'title': 'Foo'}))
+
+    def test_bytecode_cache(self):
+        self.make().render_template('page.tmpl', None, {'title': 'Foo'})
+        templates = self.make()
+        with mock.patch.object(templates.lookup, 'compile') as compile_:
+            self.assertEqual('<b>Foo</b>', templates.render_template('page.tmpl', None, {'title': 'Foo'}))
+            self.assertFalse(compile_.called)
+
+    def test_template_deps(self):
+        expected = [os.path.join(self.templates, 'page.tmpl'),
+                    os.path.join(self.templates, 'base.tmpl')]
+        self.assertEqual(expected, self.make().template_deps('page.tmpl'))
+        templates = self.make()
+        with mock.patch.object(templates.lookup, 'parse') as parse:
+            self.assertEqual(expected, templates.template_deps('page.tmpl'))
+            self.assertFalse(parse.called)
+        self.write('page.tmpl', 'No inheritance')
+        self.assertEqual(expected[:1], self.make().template_deps('page.tmpl'))
+
+    def test_template_deps_are_copied(self):
+        templates = self.make()
+        deps = templates.template_deps('page.tmpl')
+        deps.append('posts/a.rst')
+        self.assertNotIn('posts/a.rst', templates.template_deps('page.tmpl'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+# This code is so you can run the samples without installing the package,
+# and should be before any import touching nikola, in any file under tests/
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import io
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from nikola.plugins.template.mako import MakoTemplates
+
+
+class MakoCacheTest(unittest.TestCase):
+    """Compiled templates and dependencies kept across runs."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.templates = os.path.join(self.tmpdir, 'templates')
+        os.makedirs(self.templates)
+        self.write('base.tmpl', '<b>${self.body()}</b>')
+        self.write('page.tmpl', '<%inherit file="base.tmpl"/>${title}')
+        self.cache_folder = os.path.join(self.tmpdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, data):
+        with io.open(os.path.join(self.templates, name), 'w', encoding='utf8') as outf:
+            outf.write(data)
+
+    def make(self):
+        templates = MakoTemplates()
+        templates.cache = {}
+        templates.set_directories([self.templates], self.cache_folder)
+        return templates
+
+    def test_render(self):
+        self.assertEqual('<b>Foo</b>', self.make().render_template('page.tmpl', None, {'title': 'Foo'}))
+        self.write('page.tmpl', '<%inherit file="base.tmpl"/>-${title}-')
+        self.assertEqual('<b>-Foo-</b>', self.make().render_template('page.tmpl', None, {'title': 'Foo'}))
+
+    def test_module_kept(self):
+        self.make().render_template('page.tmpl', None, {'title': 'Foo'})
+        with mock.patch('mako.template._compile_module_file') as compile_module:
+            self.assertEqual('<b>Foo</b>', self.make().render_template('page.tmpl', None, {'title': 'Foo'}))
+            self.assertFalse(compile_module.called)
+
+    def test_old_modules_removed(self):
+        templates = self.make()
+        templates.render_template('page.tmpl', None, {'title': 'Foo'})
+        old = templates.module_filename(os.path.join(self.templates, 'page.tmpl'), 'page.tmpl')
+        with io.open(old + 'c', 'wb'):
+            pass
+        self.write('page.tmpl', '<%inherit file="base.tmpl"/>-${title}-')
+        templates = self.make()
+        templates.render_template('page.tmpl', None, {'title': 'Foo'})
+        new = templates.module_filename(os.path.join(self.templates, 'page.tmpl'), 'page.tmpl')
+        modules = [m for m in os.listdir(templates.cache_dir) if m.startswith('page.tmpl.')]
+        self.assertEqual([os.path.basename(new)], modules)
+        self.assertTrue(os.path.exists(templates.module_filename(
+            os.path.join(self.templates, 'base.tmpl'), 'base.tmpl')))
+
+    def test_same_uri_in_other_folder(self):
+        other = os.path.join(self.tmpdir, 'other')
+        os.makedirs(other)
+        with io.open(os.path.join(other, 'page.tmpl'), 'w', encoding='utf8') as outf:
+            outf.write('${title}!')
+        templates = self.make()
+        templates.render_template('page.tmpl', None, {'title': 'Foo'})
+        module = templates.module_filename(os.path.join(self.templates, 'page.tmpl'), 'page.tmpl')
+        other_templates = MakoTemplates()
+        other_templates.cache = {}
+        other_templates.set_directories([other], self.cache_folder)
+        self.assertEqual('Foo!', other_templates.render_template('page.tmpl', None, {'title': 'Foo'}))
+        self.assertTrue(os.path.exists(module))
+        with mock.patch('mako.template._compile_module_file') as compile_module:
+            self.assertEqual('<b>Foo</b>', self.make().render_template('page.tmpl', None, {'title': 'Foo'}))
+            self.assertFalse(compile_module.called)
+
+    def test_template_deps(self):
+        expected = [os.path.join(self.templates, 'page.tmpl'),
+                    os.path.join(self.templates, 'base.tmpl')]
+        self.assertEqual(expected, self.make().template_deps('page.tmpl'))
+        with mock.patch('nikola.plugins.template.mako.lexer') as lexer:
+            templates = self.make()
+            self.assertEqual(expected, templates.template_deps('page.tmpl'))
+            self.assertFalse(lexer.Lexer.called)
+        self.write('page.tmpl', 'No inheritance')
+        self.assertEqual(expected[:1], self.make().template_deps('page.tmpl'))
+
+
+if __name__ == '__main__':
+    unittest.main()
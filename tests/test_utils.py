@@ -8,11 +8,18 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 
+import codecs
+import copy
+import json
+import shutil
+import tempfile
 import unittest
 import mock
 import lxml.html
-from nikola.post import get_meta
-from nikola.utils import demote_headers, TranslatableSetting
+from nikola.post import get_meta, TranslatedMetadata
+from nikola.nikola import Nikola
+from nikola.utils import (demote_headers, TranslatableSetting, SourceIndex, LRUCache,
+                          ConfigSerializer, CustomEncoder)
 
 
 class dummy(object):
@@ -20,6 +27,20 @@ class dummy(object):
 
 
 class GetMetaTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_post(self, name, file_metadata):
+        post = dummy()
+        post.source_path = os.path.join(self.tmpdir, name)
+        post.metadata_path = post.source_path + '.meta'
+        with codecs.open(post.source_path, 'w+', 'utf8') as outf:
+            outf.write(''.join(file_metadata))
+        return post
+
     def test_getting_metadata_from_content(self):
         file_metadata = [".. title: Nikola needs more tests!\n",
                          ".. slug: write-tests-now\n",
@@ -29,15 +50,8 @@ class GetMetaTest(unittest.TestCase):
                          ".. description:\n",
                          "Post content\n"]
 
-        opener_mock = mock.mock_open(read_data=file_metadata)
-        opener_mock.return_value.readlines.return_value = file_metadata
-
-        post = dummy()
-        post.source_path = 'file_with_metadata'
-        post.metadata_path = 'file_with_metadata.meta'
-
-        with mock.patch('nikola.post.codecs.open', opener_mock, create=True):
-            meta = get_meta(post)
+        post = self.make_post('file_with_metadata', file_metadata)
+        meta = get_meta(post)
 
         self.assertEqual('Nikola needs more tests!', meta['title'])
         self.assertEqual('write-tests-now', meta['slug'])
@@ -55,15 +69,8 @@ class GetMetaTest(unittest.TestCase):
                          "Post Title\n",
                          "----------\n"]
 
-        opener_mock = mock.mock_open(read_data=file_metadata)
-        opener_mock.return_value.readlines.return_value = file_metadata
-
-        post = dummy()
-        post.source_path = 'file_with_metadata'
-        post.metadata_path = 'file_with_metadata.meta'
-
-        with mock.patch('nikola.post.codecs.open', opener_mock, create=True):
-            meta = get_meta(post)
+        post = self.make_post('file_with_metadata', file_metadata)
+        meta = get_meta(post)
 
         self.assertEqual('Post Title', meta['title'])
         self.assertEqual('write-tests-now', meta['slug'])
@@ -79,15 +86,8 @@ class GetMetaTest(unittest.TestCase):
                          ".. link:\n",
                          ".. description:\n"]
 
-        opener_mock = mock.mock_open(read_data=file_metadata)
-        opener_mock.return_value.readlines.return_value = file_metadata
-
-        post = dummy()
-        post.source_path = 'file_with_metadata'
-        post.metadata_path = 'file_with_metadata.meta'
-
-        with mock.patch('nikola.post.codecs.open', opener_mock, create=True):
-            meta = get_meta(post, 'file_with_metadata')
+        post = self.make_post('file_with_metadata', file_metadata)
+        meta = get_meta(post, 'file_with_metadata')
 
         self.assertEqual('file_with_metadata', meta['title'])
         self.assertEqual('write-tests-now', meta['slug'])
@@ -104,15 +104,8 @@ class GetMetaTest(unittest.TestCase):
                          ".. description:\n",
                          "Post content\n"]
 
-        opener_mock = mock.mock_open(read_data=file_metadata)
-        opener_mock.return_value.readlines.return_value = file_metadata
-
-        post = dummy()
-        post.source_path = 'Slugify this'
-        post.metadata_path = 'Slugify this.meta'
-
-        with mock.patch('nikola.post.codecs.open', opener_mock, create=True):
-            meta = get_meta(post, 'Slugify this')
+        post = self.make_post('Slugify this', file_metadata)
+        meta = get_meta(post, 'Slugify this')
 
         self.assertEqual('Nikola needs more tests!', meta['title'])
         self.assertEqual('slugify-this', meta['slug'])
@@ -121,6 +114,16 @@ class GetMetaTest(unittest.TestCase):
         self.assertFalse('link' in meta)
         self.assertFalse('description' in meta)
 
+    def test_get_meta_from_new_style_meta_file(self):
+        post = self.make_post('two_file', ["Post content\n"])
+        with codecs.open(post.metadata_path, 'w+', 'utf8') as outf:
+            outf.write(".. title: From the meta file\n.. slug: meta-slug\n")
+
+        meta = get_meta(post)
+
+        self.assertEqual('From the meta file', meta['title'])
+        self.assertEqual('meta-slug', meta['slug'])
+
     def test_extracting_metadata_from_filename(self):
         post = dummy()
         post.source_path = '2013-01-23-the_slug-dubdubtitle.md'
@@ -144,6 +147,46 @@ class GetMetaTest(unittest.TestCase):
         self.assertEqual('the_slug', meta['slug'])
 
 
+class TranslatedMetadataTest(unittest.TestCase):
+    def test_lookups(self):
+        default = {'title': 'Title', 'slug': 'the-slug'}
+        meta = TranslatedMetadata({'title': 'Titulo'}, default)
+
+        self.assertEqual('Titulo', meta['title'])
+        self.assertEqual('the-slug', meta['slug'])
+        self.assertEqual('', meta['author'])
+        self.assertTrue('slug' in meta)
+        self.assertFalse('author' in meta)
+        self.assertEqual(None, meta.get('author'))
+        self.assertEqual(sorted(['slug', 'title']), sorted(meta.keys()))
+
+    def test_updates_do_not_touch_default(self):
+        default = {'title': 'Title'}
+        meta = TranslatedMetadata({}, default)
+        meta.update({'title': 'Titulo'})
+        meta['slug'] = 'el-slug'
+
+        self.assertEqual('Titulo', meta['title'])
+        self.assertEqual('el-slug', meta['slug'])
+        self.assertEqual({'title': 'Title'}, default)
+
+    def test_behaves_like_a_dict(self):
+        default = {'title': 'Title', 'slug': 'the-slug'}
+        meta = TranslatedMetadata({'title': 'Titulo'}, default)
+        merged = {'title': 'Titulo', 'slug': 'the-slug'}
+
+        self.assertTrue(isinstance(meta, dict))
+        self.assertEqual(merged, meta)
+        self.assertEqual(merged, dict(meta))
+        self.assertEqual(merged, json.loads(json.dumps(meta)))
+        for meta_copy in (copy.copy(meta), copy.deepcopy(meta), meta.copy()):
+            self.assertEqual(merged, meta_copy)
+            meta_copy['slug'] = 'el-slug'
+            self.assertEqual('the-slug', meta['slug'])
+        self.assertEqual('the-slug', meta.setdefault('slug', 'el-slug'))
+        self.assertEqual({'title': 'Title', 'slug': 'the-slug'}, default)
+
+
 class HeaderDemotionTest(unittest.TestCase):
     def demote_by_zero(self):
         input_str = '''\
@@ -322,5 +365,129 @@ class TranslatableSettingsTest(unittest.TestCase):
         self.assertEqual(inp['zz'], cn)
 
 
+class SourceIndexTest(unittest.TestCase):
+    config = {'TRANSLATIONS_PATTERN': '{path}.{lang}.{ext}',
+              'DEFAULT_LANG': 'en',
+              'TRANSLATIONS': {'en': '', 'es': './es', 'pl': './pl'}}
+
+    def setUp(self):
+        self.index = SourceIndex(self.config)
+        self.index.add_folder(os.path.join('posts', 'sub'),
+                              ['a.rst', 'a.es.rst', 'b.pl.rst', 'b.meta', 'c.txt'])
+
+    def test_lookups(self):
+        self.assertTrue(self.index.isfile(os.path.join('posts', 'sub', 'a.rst')))
+        self.assertFalse(self.index.isfile(os.path.join('posts', 'sub', 'a.pl.rst')))
+        self.assertTrue(self.index.exists(os.path.join('posts', 'sub', 'b.meta')))
+
+    def test_not_indexed(self):
+        with mock.patch('nikola.utils.os.path.isfile', mock.Mock(return_value=True)) as isfile:
+            self.assertTrue(self.index.isfile(os.path.join('stories', 'a.rst')))
+            isfile.assert_called_once_with(os.path.join('stories', 'a.rst'))
+
+    def test_glob(self):
+        self.assertEqual(
+            sorted([os.path.join('posts', 'sub', 'a.rst'),
+                    os.path.join('posts', 'sub', 'a.es.rst'),
+                    os.path.join('posts', 'sub', 'b.pl.rst')]),
+            sorted(self.index.glob(os.path.join('posts', 'sub'), '*.rst')))
+
+    def test_translations(self):
+        path = os.path.join('posts', 'sub', 'a.rst')
+        self.assertEqual({'en': path, 'es': os.path.join('posts', 'sub', 'a.es.rst')},
+                         self.index.translations(path))
+        self.assertEqual({'pl': os.path.join('posts', 'sub', 'b.pl.rst')},
+                         self.index.translations(os.path.join('posts', 'sub', 'b.rst')))
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_least_recently_used_are_dropped(self):
+        cache = LRUCache(8)
+        for i in range(8):
+            cache[i] = i
+        for i in range(4):
+            self.assertEqual(i, cache.get(i))
+        cache[8] = 8
+        self.assertEqual(7, len(cache))
+        self.assertNotIn(4, cache)
+        self.assertNotIn(5, cache)
+        self.assertIn(0, cache)
+        self.assertEqual(None, cache.get(4))
+
+
+class ConfigSerializerTest(unittest.TestCase):
+    def setUp(self):
+        self.shared = {'blog_title': 'Foo', 'translations': {'en': '', 'es': './es'},
+                       'render': len, 'date': None, 'numbers': {1.5: [1, 'x'], True: 0}}
+
+    def test_same_as_json(self):
+        serializer = ConfigSerializer()
+        for i in range(3):
+            config = {1: {'global': self.shared, 'posts': [('a', i)]},
+                      2: self.shared, 3: {}}
+            self.assertEqual(json.dumps(config, cls=CustomEncoder, sort_keys=True),
+                             serializer.dumps(config))
+        self.assertIn(id(self.shared), serializer.shared)
+
+    def test_reset(self):
+        serializer = ConfigSerializer()
+        serializer.dumps({'global': self.shared})
+        serializer.dumps({'global': self.shared})
+        serializer.reset()
+        self.shared['blog_title'] = 'Bar'
+        self.assertIn('"Bar"', serializer.dumps({'global': self.shared}))
+
+    def test_changed_dictionaries(self):
+        serializer = ConfigSerializer()
+        for i in range(2):
+            self.assertEqual(json.dumps(self.shared, cls=CustomEncoder, sort_keys=True),
+                             serializer.dumps(self.shared))
+        self.assertIn(id(self.shared), serializer.shared)
+        for change in (lambda d: d.update(blog_title='Bar'),
+                       lambda d: d.update(new_key=None),
+                       lambda d: d.pop('date'),
+                       lambda d: d['translations'].update(es='./spanish'),
+                       lambda d: d.update(translations={'en': ''})):
+            before = serializer.dumps(self.shared)
+            change(self.shared)
+            after = serializer.dumps(self.shared)
+            self.assertNotEqual(before, after)
+            self.assertEqual(json.dumps(self.shared, cls=CustomEncoder, sort_keys=True), after)
+
+
+class PostListDepsTest(unittest.TestCase):
+    def test_template_deps_are_not_modified(self):
+        site = Nikola()
+        template_deps = ['templates/index.tmpl']
+        site._template_system = mock.Mock()
+        site._template_system.template_deps.return_value = template_deps
+        post = mock.Mock()
+        post.deps.return_value = ['posts/a.rst']
+        post.meta = {'en': {'title': 'A'}}
+        post.permalink.return_value = '/posts/a/'
+        site.config['BLOG_TITLE'] = site.config['BLOG_DESCRIPTION'] = lambda lang: ''
+        task = site.generic_post_list_renderer('en', [post], 'output/index.html',
+                                               'index.tmpl', {}, {})
+        self.assertEqual(['templates/index.tmpl', 'posts/a.rst'], task['file_dep'])
+        self.assertEqual(['templates/index.tmpl'], template_deps)
+
+
+class URLReplacerCacheTest(unittest.TestCase):
+    sources = ['/index.html', '/posts/a.html', '/posts/b.html', '/posts/x/index.html', '/']
+    links = ['', '#x', '?q=1', 'a.html', 'b.html', '/posts/a.html', '/posts/a.html#f',
+             '../', '.', 'http://example.com/', '/assets/css/x.css', 'link:/foo', '/posts/']
+
+    def test_cached_links_are_the_same(self):
+        site = Nikola()
+        for url_type in ('rel_path', 'full_path', 'absolute'):
+            site.config['URL_TYPE'] = url_type
+            for _ in range(2):
+                for src in self.sources:
+                    for dst in self.links:
+                        self.assertEqual(site._url_replacer(src, dst, 'en')[0],
+                                         site.url_replacer(src, dst),
+                                         (url_type, src, dst))
+
+
 if __name__ == '__main__':
     unittest.main()